@@ -23,6 +23,18 @@ Function UDiff.unified_diff(a, b):
 Class SequenceMatcher:
     A flexible class for comparing pairs of sequences of any type.
 
+Class BIndex:
+    The index of the second sequence a SequenceMatcher works with.
+
+Class BIndexCache:
+    A bounded LRU cache of BIndex objects; BINDEX_CACHE is process-wide.
+
+Class CancelToken:
+    A flag for stopping a long comparison early; see DiffCancelled.
+
+Class Algorithm:
+    Engines SequenceMatcher can use to compute matching blocks.
+
 Class Differ:
     For producing human-readable deltas from sequences of lines of text.
 
@@ -36,14 +48,19 @@ __all__ = ['Util', 'ndiff', 'restore', 'SequenceMatcher',
            'Differ',
            'is_character_junk', 'is_line_junk',
            'CDiff', 'UDiff',
-           'HtmlDiff', 'Match']
+           'HtmlDiff', 'Match', 'Algorithm', 'Kernel', 'BIndex',
+           'BIndexCache', 'CacheInfo', 'BINDEX_CACHE', 'CostLimits',
+           'CancelToken', 'DiffCancelled', 'Strategy', 'MinHashLSH']
 
 from typing import Any
 from typing import Callable
+from typing import Deque
 from typing import Dict
 from typing import Generic
 from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import Mapping
 from typing import NamedTuple
 from typing import Optional
 from typing import Set
@@ -52,10 +69,75 @@ from typing import Tuple
 from typing import TypeVar
 from typing import Union
 
+from array import array
+from bisect import bisect_left
 from enum import Enum
 from heapq import nlargest as _nlargest
+from itertools import islice
+from itertools import repeat
+from collections import Counter
+from collections import OrderedDict
+from collections import deque
 import collections.abc
+from concurrent.futures import Executor
+from concurrent.futures import Future
+import mmap
+import pickle
+import random
 import re
+import struct
+import sys
+import threading
+import time
+
+try:
+    import numpy as _np
+except ImportError:  # pragma: no cover
+    _np = None  # type: ignore
+
+# default memory budget of Algorithm.Hirschberg, and the bytes per entry
+# of a Myers trace it assumes
+_MEMORY_BUDGET = 64 << 20
+_TRACE_ENTRY_SIZE = 64
+
+# leading bytes of a file written by BIndex.save
+_BINDEX_MAGIC = b'GDBINDX1'
+
+# default number of elements of each side Differ.compare_stream holds
+_STREAM_WINDOW = 4096
+
+# most elements of b before those appended that extend_seq2 looks into
+# again
+_APPEND_REACH = 4096
+
+# default number of indexes a BIndexCache holds
+_CACHE_SIZE = 128
+
+# minimum rows of a, and pairs per chunk, for the NumPy kernel
+_NUMPY_MIN_ROWS = 32
+_NUMPY_CHUNK = 1 << 20
+
+# minimum pairs of lines, and most element counts of a side, for Differ
+# to bound the ratios of a replace block with NumPy
+_NUMPY_MIN_PAIRS = 1024
+_NUMPY_MAX_COUNTS = 1 << 22
+
+# the Mersenne prime the MinHash functions of MinHashLSH work modulo
+_MINHASH_PRIME = (1 << 31) - 1
+
+# minimum pairs of lines of a replace block Differ hands to its executor
+_PARALLEL_MIN_PAIRS = 256
+
+# for Algorithm.Auto: the elements sampled from a sequence, the largest
+# len(a) * len(b) left to Algorithm.Default outright, and the most edits
+# Algorithm.Myers is picked for, counted as substitutions: an insertion or
+# a deletion counts half
+_AUTO_SAMPLE = 256
+_AUTO_SMALL = 1 << 16
+_AUTO_EDITS = 64
+
+# element types whose __eq__ and __hash__ are too cheap to intern
+_CHEAP_TYPES = frozenset([str, bytes, int, float, bool, type(None)])
 
 TElem = TypeVar('TElem')
 TTag = str
@@ -82,6 +164,40 @@ class EditOp(Enum):
 OpCode = Tuple[EditOp, int, int, int, int]
 
 
+class Algorithm(Enum):
+    """Enum values for matching-block engine of SequenceMatcher."""
+    Default = "default"
+    Myers = "myers"
+    Patience = "patience"
+    Hirschberg = "hirschberg"
+    Auto = "auto"
+
+    def __str__(self) -> str:
+        return self.value
+
+    def __repr__(self) -> str:
+        return self.value
+
+
+TAlgo = Union[Algorithm, str]
+
+
+class Kernel(Enum):
+    """Enum values for longest-match search of SequenceMatcher."""
+    Dict = "dict"
+    NumPy = "numpy"
+    Suffix = "suffix"
+
+    def __str__(self) -> str:
+        return self.value
+
+    def __repr__(self) -> str:
+        return self.value
+
+
+TKernel = Union[Kernel, str]
+
+
 class Result(Generic[TElem]):  # pylint: disable=too-few-public-methods
     """Different part."""
     __slot__ = ['edit_op', 'first', 'second']
@@ -147,13 +263,1157 @@ class Match(NamedTuple):
     size: int
 
 
+class CostLimits(NamedTuple):
+    """Caps on the work of one comparison; None means no cap.
+
+    probes caps the probes find_longest_match() makes while one set of
+    matching blocks is computed -- one per element of a looked up in
+    b2j, and one per (i, j) pair found, whatever the kernel; once
+    they're used up, the remaining windows are matched greedily, each
+    on the longest of the runs that start where an element of a first
+    occurs in b.  pair_ratios caps the pairs of lines whose similarity
+    Differ may score in one compare(); a replaced block of lines that
+    would go over it is dumped as a plain delete and insert.  edits caps
+    D for the O(ND) engines, Algorithm.Myers and Algorithm.Hirschberg;
+    a window needing more edits than that is matched greedily too.
+
+    Whatever hit a cap sets the approximate flag of the SequenceMatcher
+    or Differ: the result is a correct delta, but not the one an
+    unlimited comparison would give.
+    """
+    probes: Optional[int] = None
+    pair_ratios: Optional[int] = None
+    edits: Optional[int] = None
+
+
+class MinHashLSH(NamedTuple):
+    """Settings of the locality-sensitive hashing Differ can pair up the
+    lines of big replace blocks with.
+
+    Every line is reduced to the set of its runs of `shingle` elements,
+    and that set to bands * rows MinHash values; then only the pairs of
+    lines that agree on all the rows of at least one band are scored,
+    instead of all pairs.  Two lines whose sets have Jaccard similarity
+    s are scored with probability 1 - (1 - s**rows)**bands: more bands
+    miss fewer close pairs, more rows score fewer distant ones, and both
+    take longer to hash.  With the defaults that's 99% for s = 0.5, 94%
+    for 0.44, 69% for 0.33 and 10% for 0.15; about 95% of the pairs of
+    lines of text scoring 0.75 have s above 0.44, and 90% of unrelated
+    ones below 0.15.  Blocks of fewer than min_pairs pairs are scored in
+    full.
+
+    >>> differ = Differ(lsh=MinHashLSH(min_pairs=0))
+    >>> list(differ.compare(['abcdefgh', 'ijklmnop'],
+    ...                     ['abcdefgX', 'ijklmnoX']))
+    [[Delete]abcdefgh, [Insert]abcdefgX, [Delete]ijklmnop, [Insert]ijklmnoX]
+    >>> differ.approximate
+    True
+    """
+    bands: int = 32
+    rows: int = 3
+    shingle: int = 2
+    min_pairs: int = 1 << 16
+    seed: int = 0
+
+
+class Strategy(NamedTuple):
+    """What Algorithm.Auto picked for a pair of sequences, and why."""
+    algorithm: Algorithm
+    kernel: Kernel
+    intern: bool
+    reason: str
+
+
+class DiffCancelled(Exception):
+    """Raised by a comparison whose CancelToken was cancelled."""
+
+
+class CancelToken:
+    """A flag for stopping a comparison from another thread, or after a
+    deadline.
+
+    Pass it as the cancel argument of SequenceMatcher or Differ.  The
+    comparison looks at it between two bounded pieces of work, and raises
+    DiffCancelled once cancel() has been called or `timeout` seconds have
+    passed since the token was made.
+
+    >>> token = CancelToken()
+    >>> s = SequenceMatcher(None, "abxcd", "abcd", cancel=token)
+    >>> token.cancel()
+    >>> s.get_matching_blocks()
+    Traceback (most recent call last):
+    ...
+    gdifflib.DiffCancelled: comparison cancelled
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self._event = threading.Event()
+        self.deadline = (None if timeout is None
+                         else time.monotonic() + timeout)
+
+    def cancel(self) -> None:
+        """Make the comparisons using the token stop."""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """True iff cancel() was called or the deadline has passed."""
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self._event.set()
+        return self._event.is_set()
+
+    def check(self) -> None:
+        """Raise DiffCancelled if the token is cancelled."""
+        if self.cancelled:
+            raise DiffCancelled('comparison cancelled')
+
+
+def _sample(seq: Sequence[Any]) -> List[Any]:
+    """Return up to _AUTO_SAMPLE elements of seq, evenly spaced."""
+    size = min(len(seq), _AUTO_SAMPLE)
+    return [seq[pos * len(seq) // size] for pos in range(size)]
+
+
+def _cheap_elements(seq: Sequence[Any]) -> bool:
+    """Return true iff the elements of seq look too cheap to intern."""
+    if isinstance(seq, (str, bytes, bytearray, array)) or (
+            _np is not None and isinstance(seq, _np.ndarray)):
+        return True
+    return all(type(elt) in _CHEAP_TYPES for elt in _sample(seq))
+
+
+def _int_coded(seq: Sequence[Any]) -> bool:
+    """Return true iff the NumPy kernel can take seq as it is."""
+    if isinstance(seq, array):
+        return seq.typecode in 'bBhHiIlLqQ'
+    if _np is not None and isinstance(seq, _np.ndarray):
+        return seq.ndim == 1 and seq.dtype.kind in 'iu'
+    # pylint: disable=unidiomatic-typecheck
+    return all(type(elt) is int for elt in seq)
+
+
+def _quick_candidates(lines_a: List[Sequence[Any]],
+                      lines_b: List[Sequence[Any]],
+                      cutoff: float) -> Iterator[Iterable[int]]:
+    """For each of lines_b, generate the indices of the lines_a whose
+    quick_ratio() with it is at least cutoff.
+
+    The elements of every line are counted once, up front, and the
+    multiset intersections of the counts -- the matches quick_ratio()
+    counts -- are taken for a whole row of pairs at once with NumPy, or
+    pair by pair, after the real_quick_ratio() bound, without it.
+
+    >>> list(_quick_candidates(['abcd', 'wxyz', 'abce'], ['abcf', 'wxyq'],
+    ...                        0.75))
+    [[0, 2], [1]]
+    """
+    # pylint: disable=too-many-locals
+    lengths_a = [len(line) for line in lines_a]
+    vocab: Dict[Any, int] = {}
+    for line in lines_a + lines_b:
+        for elt in line:
+            vocab.setdefault(elt, len(vocab))
+    if _np is not None and len(lines_a) * len(lines_b) >= (
+            _NUMPY_MIN_PAIRS) and len(lines_a) * len(vocab) <= (
+                _NUMPY_MAX_COUNTS):
+        width = max(len(vocab), 1)
+        counts_a = _np.zeros((len(lines_a), width), dtype=_np.int32)
+        for row, line in enumerate(lines_a):
+            counts_a[row] = _np.bincount([vocab[elt] for elt in line],
+                                         minlength=width)
+        totals_a = _np.array(lengths_a, dtype=_np.float64)
+        for line in lines_b:
+            counts_b = _np.bincount([vocab[elt] for elt in line],
+                                    minlength=width)
+            matches = _np.minimum(counts_a, counts_b).sum(axis=1)
+            with _np.errstate(divide='ignore', invalid='ignore'):
+                # 0 / 0 is nan, and two empty lines have ratio 1
+                low = 2.0 * matches / (totals_a + len(line)) < cutoff
+            yield _np.flatnonzero(~low).tolist()
+        return
+    counters_a = [Counter(line) for line in lines_a]
+    for line in lines_b:
+        len_b, count_b = len(line), Counter(line)
+        candidates = []
+        for col, len_a in enumerate(lengths_a):
+            total = len_a + len_b
+            if _calculate_ratio(min(len_a, len_b), total) < cutoff:
+                continue
+            matches = sum(min(num, count_b[elt])
+                          for elt, num in counters_a[col].items())
+            if _calculate_ratio(matches, total) >= cutoff:
+                candidates.append(col)
+        yield candidates
+
+
+def _minhashes(shingles: List[List[int]],
+               mults: List[int],
+               adds: List[int]) -> Iterator[List[int]]:
+    """For each non-empty list of shingle numbers, generate its minimum
+    under every hash (mult * number + add) % _MINHASH_PRIME."""
+    if _np is None:
+        for ids in shingles:
+            yield [min((mult * num + add) % _MINHASH_PRIME for num in ids)
+                   for mult, add in zip(mults, adds)]
+        return
+    np_mults = _np.array(mults, dtype=_np.int64)[:, None]
+    np_adds = _np.array(adds, dtype=_np.int64)[:, None]
+    # the lines of a chunk are hashed at once, one column per shingle,
+    # and chunks hold about _NUMPY_CHUNK hashes
+    chunk = max(_NUMPY_CHUNK // len(mults), 1)
+    lo = 0
+    while lo < len(shingles):
+        hi, count = lo, 0
+        while hi < len(shingles) and (hi == lo or
+                                      count + len(shingles[hi]) <= chunk):
+            count += len(shingles[hi])
+            hi += 1
+        flat = _np.array([num for ids in shingles[lo:hi] for num in ids],
+                         dtype=_np.int64)
+        starts = _np.cumsum([0] + [len(ids) for ids in shingles[lo:hi - 1]])
+        hashed = (np_mults * flat + np_adds) % _MINHASH_PRIME
+        yield from _np.minimum.reduceat(hashed, starts, axis=1).T.tolist()
+        lo = hi
+
+
+def _lsh_candidates(lines_a: List[Sequence[Any]],
+                    lines_b: List[Sequence[Any]],
+                    cutoff: float,
+                    lsh: MinHashLSH) -> Iterator[Iterable[int]]:
+    """Like _quick_candidates(), but only among the lines_a that share a
+    MinHashLSH bucket with each of lines_b."""
+    # pylint: disable=too-many-locals
+    numbers: Dict[Tuple[Any, ...], int] = {}
+    rng = random.Random(lsh.seed)
+    mults = [rng.randrange(1, _MINHASH_PRIME)
+             for _ in range(lsh.bands * lsh.rows)]
+    adds = [rng.randrange(0, _MINHASH_PRIME) for _ in mults]
+
+    def bands(lines: List[Sequence[Any]]) -> List[List[Tuple[int, ...]]]:
+        # the keys of the buckets of each line, one per band; shingles
+        # are numbered in order of appearance, and empty lines have none
+        shingles = []
+        for line in lines:
+            runs = [tuple(line[pos:pos + lsh.shingle])
+                    for pos in range(max(len(line) - lsh.shingle, 0) + 1)]
+            shingles.append(sorted({numbers.setdefault(run, len(numbers))
+                                    for run in runs} if line else ()))
+        mins = _minhashes([ids for ids in shingles if ids], mults, adds)
+        keys = []
+        for ids in shingles:
+            sig = next(mins) if ids else []
+            keys.append([(band,) + tuple(sig[band * lsh.rows:
+                                             (band + 1) * lsh.rows])
+                         for band in range(lsh.bands) if sig])
+        return keys
+
+    buckets: Dict[Tuple[int, ...], List[int]] = {}
+    for col, keys in enumerate(bands(lines_a)):
+        for key in keys:
+            buckets.setdefault(key, []).append(col)
+    counters_a = [Counter(line) for line in lines_a]
+    for line, keys in zip(lines_b, bands(lines_b)):
+        cols: Set[int] = set()
+        for key in keys:
+            cols.update(buckets.get(key, ()))
+        len_b, count_b = len(line), Counter(line)
+        candidates = []
+        for col in sorted(cols):
+            total = len(lines_a[col]) + len_b
+            matches = sum(min(num, count_b[elt])
+                          for elt, num in counters_a[col].items())
+            if _calculate_ratio(matches, total) >= cutoff:
+                candidates.append(col)
+        yield candidates
+
+
+def _as_int_array(seq: Sequence[Any], name: str) -> Any:
+    codes = _np.asarray(seq)
+    if codes.ndim != 1 or (codes.size and codes.dtype.kind not in 'iu'):
+        raise TypeError('kernel numpy needs integer-coded sequences, '
+                        'not %s for %s; try intern=True' % (codes.dtype, name))
+    return codes.astype(_np.int64, copy=False)
+
+
+class _SuffixAutomaton:  # pylint: disable=too-few-public-methods
+    """Suffix automaton of seq[lo:hi].
+
+    State 0 is the initial state.  For each state, trans maps an element
+    to the next state, link is the suffix link, length the length of the
+    longest string of the state, and first the index in seq at which its
+    strings end for the first time.
+    """
+
+    def __init__(self, seq: Sequence[Any], lo: int, hi: int):
+        trans: List[Dict[Any, int]] = [{}]
+        link, length, first = [-1], [0], [-1]
+        last = 0
+        for pos in range(lo, hi):
+            elt = seq[pos]
+            cur = len(length)
+            trans.append({})
+            link.append(0)
+            length.append(length[last] + 1)
+            first.append(pos)
+            state = last
+            while state != -1 and elt not in trans[state]:
+                trans[state][elt] = cur
+                state = link[state]
+            if state != -1:
+                nxt = trans[state][elt]
+                if length[state] + 1 == length[nxt]:
+                    link[cur] = nxt
+                else:
+                    clone = len(length)
+                    trans.append(dict(trans[nxt]))
+                    link.append(link[nxt])
+                    length.append(length[state] + 1)
+                    first.append(first[nxt])
+                    while state != -1 and trans[state].get(elt) == nxt:
+                        trans[state][elt] = clone
+                        state = link[state]
+                    link[nxt] = link[cur] = clone
+            last = cur
+        self.trans, self.link, self.length, self.first = (
+            trans, link, length, first)
+
+
+# Sequence types whose slices compare element by element, so that long
+# runs can be compared a slice at a time.  Note that slice comparison
+# takes identical elements as equal without calling __eq__, as the
+# SequenceMatcher docstring says.
+_SLICEABLE = (list, tuple, str, bytes)
+
+
+def _forward_run(seq_a: Sequence[Any], pos_a: int,
+                 seq_b: Sequence[Any], pos_b: int, limit: int) -> int:
+    """Return how many elements seq_a[pos_a:] and seq_b[pos_b:] have in
+    common at their start, up to limit."""
+    if limit <= 0 or seq_a[pos_a] != seq_b[pos_b]:
+        return 0
+    if type(seq_a) is not type(seq_b) or not isinstance(seq_a, _SLICEABLE):
+        size = 1
+        while size < limit and seq_a[pos_a + size] == seq_b[pos_b + size]:
+            size += 1
+        return size
+    # gallop: compare slices of 1, 2, 4, ... elements while they're equal,
+    # then binary search the slice holding the first mismatch
+    size, step = 1, 1
+    while size + step <= limit and (seq_a[pos_a + size:pos_a + size + step] ==
+                                    seq_b[pos_b + size:pos_b + size + step]):
+        size += step
+        step += step
+    span = min(step, limit - size)
+    while span > 1:
+        half = span // 2
+        if (seq_a[pos_a + size:pos_a + size + half] ==
+                seq_b[pos_b + size:pos_b + size + half]):
+            size, span = size + half, span - half
+        else:
+            span = half
+    if span and seq_a[pos_a + size] == seq_b[pos_b + size]:
+        size += 1
+    return size
+
+
+def _backward_run(seq_a: Sequence[Any], pos_a: int,
+                  seq_b: Sequence[Any], pos_b: int, limit: int) -> int:
+    """Return how many elements seq_a[:pos_a] and seq_b[:pos_b] have in
+    common at their end, up to limit."""
+    if limit <= 0 or seq_a[pos_a - 1] != seq_b[pos_b - 1]:
+        return 0
+    if type(seq_a) is not type(seq_b) or not isinstance(seq_a, _SLICEABLE):
+        size = 1
+        while size < limit and (seq_a[pos_a - size - 1] ==
+                                seq_b[pos_b - size - 1]):
+            size += 1
+        return size
+    size, step = 1, 1
+    while size + step <= limit and (seq_a[pos_a - size - step:pos_a - size] ==
+                                    seq_b[pos_b - size - step:pos_b - size]):
+        size += step
+        step += step
+    span = min(step, limit - size)
+    while span > 1:
+        half = span // 2
+        if (seq_a[pos_a - size - half:pos_a - size] ==
+                seq_b[pos_b - size - half:pos_b - size]):
+            size, span = size + half, span - half
+        else:
+            span = half
+    if span and seq_a[pos_a - size - 1] == seq_b[pos_b - size - 1]:
+        size += 1
+    return size
+
+
+def _spliced(seq: Sequence[Any], lo: int, hi: int,
+             new: Sequence[Any]) -> Sequence[Any]:
+    """Return seq[:lo] + new + seq[hi:], of the type of seq if that's a
+    list, tuple, str or bytes, and a list otherwise."""
+    if isinstance(seq, str):
+        return seq[:lo] + ''.join(new) + seq[hi:]
+    if isinstance(seq, list):
+        return seq[:lo] + list(new) + seq[hi:]
+    if isinstance(seq, tuple):
+        return seq[:lo] + tuple(new) + seq[hi:]
+    if isinstance(seq, bytes):
+        return seq[:lo] + bytes(new) + seq[hi:]
+    return list(seq[:lo]) + list(new) + list(seq[hi:])
+
+
+def _collapsed(matching_blocks: List[Match],
+               len_a: int, len_b: int) -> List[Match]:
+    """Return the sorted matching_blocks with adjacent blocks merged, and
+    the (len_a, len_b, 0) sentinel appended."""
+    matching_blocks.sort()
+
+    # It's possible that we have adjacent equal blocks in the
+    # matching_blocks list now.  Starting with 2.5, this code was added
+    # to collapse them.
+    pos_a1 = pos_b1 = size1 = 0
+    non_adjacent = []
+    for pos_a2, pos_b2, size2 in matching_blocks:
+        # Is this block adjacent to pos_a1, pos_b1, size1?
+        if pos_a1 + size1 == pos_a2 and pos_b1 + size1 == pos_b2:
+            # Yes, so collapse them -- this just increases the length of
+            # the first block by the length of the second, and the first
+            # block so lengthened remains the block to compare against.
+            size1 += size2
+        else:
+            # Not adjacent.  Remember the first block (size1==0 means it's
+            # the dummy we started with), and make the second block the
+            # new block to compare against.
+            if size1:
+                non_adjacent.append((pos_a1, pos_b1, size1))
+            pos_a1, pos_b1, size1 = pos_a2, pos_b2, size2
+    if size1:
+        non_adjacent.append((pos_a1, pos_b1, size1))
+
+    non_adjacent.append((len_a, len_b, 0))
+    return list(map(Match._make, non_adjacent))
+
+
+class _CompactIndex(Mapping[Any, Sequence[int]]):
+    """Read-only b2j of a SequenceMatcher(compact=True).
+
+    The indices of all elements live in one array, grouped by element:
+    those of x are indices[offsets[g]:offsets[g + 1]], g = groups[x].
+    Looking x up gives a memoryview of them, without copying.
+    """
+
+    __slots__ = ('groups', 'offsets', 'indices', '_view')
+
+    def __init__(self,
+                 groups: Dict[Any, int],
+                 offsets: Sequence[int],
+                 indices: Any):
+        self.groups = groups
+        self.offsets = offsets
+        self.indices = indices
+        self._view = memoryview(indices)
+
+    def __getitem__(self, elt: Any) -> Sequence[int]:
+        group = self.groups[elt]
+        return self._view[self.offsets[group]:self.offsets[group + 1]]
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        group = self.groups.get(key)
+        if group is None:
+            return default
+        return self._view[self.offsets[group]:self.offsets[group + 1]]
+
+    def __contains__(self, elt: Any) -> bool:
+        return elt in self.groups
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.groups)
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+
+class _Decoded(collections.abc.Sequence):  # pylint: disable=abstract-method
+    """Read-only sequence elements[codes[0]], elements[codes[1]], ...,
+    decoded one element at a time when asked for."""
+
+    __slots__ = ('elements', 'codes')
+
+    def __init__(self, elements: Sequence[Any], codes: Sequence[int]):
+        self.elements = elements
+        self.codes = codes
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self.elements[code] for code in self.codes[index]]
+        return self.elements[self.codes[index]]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
 def _calculate_ratio(matches: int, length: int) -> float:
     if length:
         return 2.0 * matches / length
     return 1.0
 
 
-# pylint: disable=too-many-instance-attributes
+# held while a BIndex gets the lock of its own it builds parts under
+_BINDEX_LOCK = threading.Lock()
+
+
+class BIndex(Generic[TElem]):  # pylint: disable=too-many-instance-attributes
+    """The index of the second sequence, b, a SequenceMatcher works with.
+
+    A BIndex holds all that a SequenceMatcher works out about b alone:
+    b2j, bjunk, bpopular and bjunkpos, the interning table if intern is
+    true, and, built on first use, fullbcount, bmasks and the tables of
+    the NumPy and suffix kernels.  None of it changes once built, and
+    the parts built on first use are built under a lock, so one BIndex
+    can be shared by any number of SequenceMatchers, in any number of
+    threads, instead of each of them indexing b again.  See
+    SequenceMatcher.set_bindex().
+
+    The mappings and sets a BIndex hands out must not be modified.
+
+    A BIndex can be written to a file with .save() and memory-mapped
+    back with BIndex.load(), so that a long b is indexed only once by
+    all the processes comparing against it.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            seq_b: Sequence[TElem],
+            isjunk: Optional[Callable[[TElem], bool]] = None,
+            autojunk: bool = True,
+            intern: bool = False,
+            compact: bool = False,
+            lazy: bool = False):
+        """Index seq_b.
+
+        Optional args isjunk, autojunk, intern and compact mean the same
+        as for SequenceMatcher, whose settings they become.
+
+        Optional arg lazy should be set to True to put off building b2j,
+        bjunk, bpopular and bjunkpos until they're first asked for, as
+        SequenceMatcher does for Algorithm.Hirschberg.
+        """
+
+        # Members:
+        # seq_b
+        #      the sequence indexed
+        # isjunk, autojunk, intern, compact
+        #      as for SequenceMatcher
+        # codes
+        #      the sequence the matchers actually work on: seq_b itself,
+        #      or its interned ids
+        # b2id, id2elt
+        #      the interning table built from seq_b, and its inverse
+        # _cache
+        #      the parts built on first use, by name
+        # _lock
+        #      held while building one of those; made on first use, as
+        #      most indexes are never shared
+        # _mapped
+        #      the mmap of the file the index was loaded from, if any
+        # _positions
+        #      for an index that can grow, the index lists of all the
+        #      non-junk elements, popular ones included
+
+        self.seq_b = seq_b
+        self.isjunk = isjunk
+        self.autojunk = autojunk
+        self.intern = intern
+        self.compact = compact
+        b2id: Dict[TElem, int] = {}
+        self.b2id = b2id
+        if intern:
+            # ids are handed out in order of first appearance in b, so
+            # id2elt is just the keys of the table
+            self.codes: Sequence[Any] = [b2id.setdefault(elt, len(b2id))
+                                         for elt in seq_b]
+        else:
+            self.codes = seq_b
+        self.id2elt: List[TElem] = list(b2id)
+        self._cache: Dict[str, Any] = {}
+        self._lock: Optional[threading.RLock] = None
+        self._mapped: Optional[mmap.mmap] = None
+        self._positions: Optional[Dict[Any, List[int]]] = None
+        if not lazy:
+            # nobody else can see the index yet, so no lock is needed
+            self._cache['chain'] = self.__chain_b()
+
+    def _cached(self, name: str, build: Callable[[], TTT]) -> TTT:
+        # Looking a dict up and storing into it are atomic, so only
+        # building needs the lock; whoever gets it first builds.
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+        if self._lock is None:
+            with _BINDEX_LOCK:
+                if self._lock is None:
+                    self._lock = threading.RLock()
+        with self._lock:
+            if name not in self._cache:
+                self._cache[name] = build()
+            return self._cache[name]
+
+    def _chain(self) -> Tuple[Mapping[Any, Sequence[int]],
+                              Set[Any], Set[Any], List[int]]:
+        return self._cached('chain', self.__chain_b)
+
+    @property
+    def b2j(self) -> Mapping[Any, Sequence[int]]:
+        """For x in b, the indices (into b) at which x appears; junk and
+        popular elements do not appear."""
+        return self._chain()[0]
+
+    @property
+    def bjunk(self) -> Set[Any]:
+        """The items in b for which isjunk is True."""
+        return self._chain()[1]
+
+    @property
+    def bpopular(self) -> Set[Any]:
+        """Nonjunk items in b treated as junk by the heuristic."""
+        return self._chain()[2]
+
+    @property
+    def bjunkpos(self) -> List[int]:
+        """The sorted indices (into b) of the junk items."""
+        return self._chain()[3]
+
+    @property
+    def fullbcount(self) -> Dict[Any, int]:
+        """For x in b, the number of times x appears in b."""
+        return self._cached('fullbcount', lambda: Counter(self.codes))
+
+    @property
+    def bmasks(self) -> Dict[Any, int]:
+        """For x in b, an int whose bit j is set iff b[j] == x."""
+        def build() -> Dict[Any, int]:
+            bmasks: Dict[Any, int] = {}
+            for pos_b, elt in _enumerate(self.codes):
+                bmasks[elt] = bmasks.get(elt, 0) | (1 << pos_b)
+            return bmasks
+        return self._cached('bmasks', build)
+
+    def numpy_tables(self) -> Tuple[Any, Any, Any]:
+        """Return the tables of b the NumPy kernel searches.
+
+        keys are the sorted keys of b2j; b2j's index lists are
+        concatenated into positions, grouped by key, and slots is the
+        matching sorted array of (key's rank) * (len(b) + 1) + position,
+        so one searchsorted() finds the part of any key's list that falls
+        in a window of b.
+        """
+        def build() -> Tuple[Any, Any, Any]:
+            codes_b = _as_int_array(self.codes, 'b')
+            keys = _np.array(sorted(self.b2j), dtype=_np.int64)
+            positions = _np.flatnonzero(_np.isin(codes_b, keys))
+            positions = positions[_np.argsort(codes_b[positions],
+                                              kind='stable')]
+            ranks = _np.searchsorted(keys, codes_b[positions])
+            slots = ranks * (len(codes_b) + 1) + positions
+            return keys, positions, slots
+        return self._cached('numpy', build)
+
+    def suffix_automaton(self) -> _SuffixAutomaton:
+        """Return the suffix automaton of the whole of b."""
+        return self._cached('automaton', lambda: _SuffixAutomaton(
+            self.codes, 0, len(self.codes)))
+
+    def edit(self,
+             lo: int,
+             hi: int,
+             new: Sequence[TElem]) -> 'BIndex[TElem]':
+        """Return the index of seq_b with seq_b[lo:hi] replaced by new.
+
+        This index isn't changed.  The new one carries over the interning
+        table and fullbcount, if built, updated by the edit alone; b2j and
+        friends are built when first asked for.
+        """
+
+        if not 0 <= lo <= hi <= len(self.seq_b):
+            raise ValueError('bad edit range [%r:%r] of %d elements' %
+                             (lo, hi, len(self.seq_b)))
+        edited: BIndex[TElem] = BIndex(_spliced(self.seq_b, lo, hi, new),
+                                       self.isjunk, self.autojunk,
+                                       compact=self.compact, lazy=True)
+        old_codes = self.codes[lo:hi]
+        new_codes: List[Any]
+        if self.intern:
+            b2id = dict(self.b2id)
+            new_codes = [b2id.setdefault(elt, len(b2id)) for elt in new]
+            edited.intern = True
+            edited.b2id, edited.id2elt = b2id, list(b2id)
+            edited.codes = _spliced(self.codes, lo, hi, new_codes)
+        else:
+            new_codes = list(new)
+        if 'fullbcount' in self._cache:
+            fullbcount = Counter(self.fullbcount)
+            fullbcount.subtract(old_codes)
+            fullbcount.update(new_codes)
+            # pylint: disable=protected-access
+            edited._cache['fullbcount'] = +fullbcount
+        return edited
+
+    def _extendable(self) -> 'BIndex[TElem]':
+        # pylint: disable=protected-access
+        # A copy of this index that _append() may grow in place: seq_b
+        # and codes are lists of its own, b2j is a dict of lists, and
+        # _positions holds the index lists of the popular elements too
+        # (those of the others are the very lists in b2j).
+        owned: BIndex[TElem] = BIndex(list(self.seq_b), self.isjunk,
+                                      self.autojunk, self.intern)
+        b2j, _, popular, _ = owned._chain()
+        positions: Dict[Any, List[int]] = dict(b2j)  # type: ignore
+        for elt in popular:
+            positions[elt] = []
+        if popular:
+            for i, elt in _enumerate(owned.codes):
+                if elt in popular:
+                    positions[elt].append(i)
+        owned._positions = positions
+        return owned
+
+    # pylint: disable=too-many-branches, too-many-locals
+    def _append(self, new: Sequence[TElem]) -> List[Any]:
+        # Append new to b of an index made by _extendable(), and return
+        # the codes of new.  A from-scratch build makes popular exactly
+        # the non-junk elements more than len(b) // 100 + 1 times in b;
+        # elements appended to may newly cross that line, the others
+        # can only drop below it as b grows, and only when the threshold
+        # moves, which is once per 100 elements.  So each element costs
+        # O(1), amortized.
+        b2j, junk, popular, junkpos = self._chain()
+        assert isinstance(b2j, dict) and self._positions is not None
+        positions = self._positions
+        start = len(self.codes)
+        old_ntest = start // 100 + 1
+        codes: List[Any]
+        if self.intern:
+            b2id, id2elt = self.b2id, self.id2elt
+            for elt in new:
+                if elt not in b2id:
+                    b2id[elt] = len(id2elt)
+                    id2elt.append(elt)
+            codes = [b2id[elt] for elt in new]
+            self.seq_b.extend(new)  # type: ignore
+            self.codes.extend(codes)  # type: ignore
+        else:
+            codes = list(new)
+            self.seq_b.extend(codes)  # type: ignore
+        isjunk = self.isjunk
+        for i, code in enumerate(codes, start):
+            found = positions.get(code)
+            if found is None:
+                if code in junk or (isjunk and isjunk(
+                        self.id2elt[code] if self.intern else code)):
+                    junk.add(code)
+                    junkpos.append(i)
+                    continue
+                found = positions[code] = b2j[code] = []
+            found.append(i)
+
+        len_b = len(self.codes)
+        if self.autojunk and len_b >= 200:
+            ntest = len_b // 100 + 1
+            crossed = start < 200
+            for code in (positions if crossed else set(codes)):
+                if code in b2j and len(positions[code]) > ntest:
+                    del b2j[code]
+                    popular.add(code)
+            if ntest != old_ntest and not crossed:
+                for code in [code for code in popular
+                             if len(positions[code]) <= ntest]:
+                    popular.discard(code)
+                    b2j[code] = positions[code]
+
+        if 'fullbcount' in self._cache:
+            self._cache['fullbcount'].update(codes)
+        for name in ('bmasks', 'numpy', 'automaton'):
+            self._cache.pop(name, None)
+        return codes
+
+    def save(self, path: str) -> None:
+        """Write the index to the file path, for BIndex.load().
+
+        The file holds the distinct elements of b, bjunk and bpopular,
+        pickled, followed by flat arrays of 8-byte ints: b as ids of its
+        elements, and b2j and bjunkpos laid out as for compact=True.  The
+        elements must be picklable; isjunk is not saved.
+
+        >>> import os, tempfile
+        >>> with tempfile.TemporaryDirectory() as tmp:
+        ...     path = os.path.join(tmp, 'b.idx')
+        ...     BIndex("abycdf").save(path)
+        ...     s = SequenceMatcher(None, "qabxcd")
+        ...     s.set_bindex(BIndex.load(path))
+        ...     s.get_opcodes() == SequenceMatcher(None, "qabxcd",
+        ...                                        "abycdf").get_opcodes()
+        True
+        """
+
+        b2j = self.b2j
+        if isinstance(b2j, _CompactIndex):
+            keys = list(b2j.groups)
+            offsets, indices = b2j.offsets, b2j.indices
+        else:
+            keys = list(b2j)
+            offsets, indices = array('q', [0]), array('q')
+            for key in keys:
+                indices.extend(b2j[key])
+                offsets.append(len(indices))
+        if self.intern:
+            elements, codes = self.id2elt, self.codes
+        else:
+            b2id: Dict[TElem, int] = {}
+            codes = [b2id.setdefault(elt, len(b2id)) for elt in self.seq_b]
+            elements = list(b2id)
+        arrays = [array('q', codes), array('q', offsets),
+                  array('q', indices), array('q', self.bjunkpos)]
+        meta = pickle.dumps({
+            'byteorder': sys.byteorder,
+            'autojunk': self.autojunk,
+            'intern': self.intern,
+            'elements': elements,
+            'keys': keys,
+            'bjunk': self.bjunk,
+            'bpopular': self.bpopular,
+            'sizes': [len(part) for part in arrays],
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+        # the arrays start on an 8-byte boundary
+        padding = -(len(_BINDEX_MAGIC) + 8 + len(meta)) % 8
+        with open(path, 'wb') as file:
+            file.write(_BINDEX_MAGIC)
+            file.write(struct.pack('<Q', len(meta)))
+            file.write(meta)
+            file.write(bytes(padding))
+            for part in arrays:
+                part.tofile(file)
+
+    @classmethod
+    def load(cls,  # pylint: disable=too-many-locals
+             path: str,
+             seq_b: Optional[Sequence[TElem]] = None) -> 'BIndex[TElem]':
+        """Return the BIndex saved to the file path by .save().
+
+        The arrays aren't read, but memory-mapped: b2j is a read-only
+        mapping over the file, as for compact=True, and the pages of the
+        file are shared by all processes that load it.  So the parts
+        that grow with len(b) cost next to nothing to load, but the
+        distinct elements of b are unpickled, and hashed again into the
+        table of b2j's keys: loading takes time in proportion to the
+        number of distinct elements, which for a b of mostly unique
+        lines is still about a third of indexing it from scratch.  The
+        file must come from a trusted source.
+
+        Optional arg seq_b is the sequence that was indexed, if the caller
+        has it at hand; by default, seq_b is a read-only sequence that
+        decodes the elements of b from the file as they're asked for.
+        The loaded index has no isjunk, but the junk found by the one it
+        was built with.
+        """
+
+        with open(path, 'rb') as file:
+            if file.read(len(_BINDEX_MAGIC)) != _BINDEX_MAGIC:
+                raise ValueError('%s is not a saved BIndex' % (path,))
+            size, = struct.unpack('<Q', file.read(8))
+            meta = pickle.loads(file.read(size))
+            if meta['byteorder'] != sys.byteorder:
+                raise ValueError('%s was saved on a %s-endian machine' %
+                                 (path, meta['byteorder']))
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        start = len(_BINDEX_MAGIC) + 8 + size
+        start += -start % 8
+        view = memoryview(mapped)
+        arrays = []
+        for length in meta['sizes']:
+            arrays.append(view[start:start + 8 * length].cast('q'))
+            start += 8 * length
+        # pylint: disable=unbalanced-tuple-unpacking
+        codes, offsets, indices, bjunkpos = arrays
+        if seq_b is not None and len(seq_b) != len(codes):
+            raise ValueError('seq_b has %d elements, the saved index %d' %
+                             (len(seq_b), len(codes)))
+
+        bindex: BIndex[TElem] = cls.__new__(cls)
+        bindex.seq_b = (_Decoded(meta['elements'], codes)
+                        if seq_b is None else seq_b)
+        bindex.isjunk = None
+        bindex.autojunk = meta['autojunk']
+        bindex.intern = meta['intern']
+        bindex.compact = True
+        bindex.id2elt = meta['elements'] if bindex.intern else []
+        bindex.b2id = {elt: code for code, elt in enumerate(bindex.id2elt)}
+        bindex.codes = codes if bindex.intern else bindex.seq_b
+        groups = {key: group for group, key in enumerate(meta['keys'])}
+        bindex._cache = {'chain': (_CompactIndex(groups, offsets, indices),
+                                   meta['bjunk'], meta['bpopular'],
+                                   bjunkpos)}
+        bindex._lock = None
+        bindex._mapped = mapped
+        bindex._positions = None
+        return bindex
+
+    # For each element x in b, set b2j[x] to a list of the indices in
+    # b where x appears; the indices are in increasing order; note that
+    # the number of times x appears in b is len(b2j[x]) ...
+    # when self.isjunk is defined, junk elements don't show up in this
+    # map at all, which stops the central find_longest_match method
+    # from starting any matching block at a junk element ...
+    # b2j also does not contain entries for "popular" elements, meaning
+    # elements that account for more than 1 + 1% of the total elements, and
+    # when the sequence is reasonably large (>= 200 elements); this can
+    # be viewed as an adaptive notion of semi-junk, and yields an enormous
+    # speedup when, e.g., comparing program files with hundreds of
+    # instances of "return NULL;" ...
+    # note that this is only called when b changes; so for cross-product
+    # kinds of matches, it's best to call set_seq2 once, then set_seq1
+    # repeatedly
+
+    def __chain_b(self) -> Tuple[Mapping[Any, Sequence[int]],
+                                 Set[Any], Set[Any], List[int]]:
+        # Because isjunk is a user-defined (not C) function, and we test
+        # for junk a LOT, it's important to minimize the number of calls.
+        # Before the tricks described here, __chain_b was by far the most
+        # time-consuming routine in the whole module!  If anyone sees
+        # Jim Roskind, thank him again for profile.py -- I never would
+        # have guessed that.
+        # The first trick is to build b2j ignoring the possibility
+        # of junk.  I.e., we don't call isjunk at all yet.  Throwing
+        # out the junk later is much cheaper than building b2j "right"
+        # from the start.
+        if self.compact:
+            return self.__chain_b_compact()
+        seq_b = self.codes
+        b2j: Dict[Any, List[int]] = {}
+
+        for i, elt in _enumerate(seq_b):
+            indices = b2j.setdefault(elt, [])
+            indices.append(i)
+
+        # Purge junk elements
+        junk: Set[Any] = set()
+        junkpos: List[int] = []
+        isjunk = self.isjunk
+        if isjunk:
+            id2elt = self.id2elt
+            for elt in b2j:
+                if isjunk(id2elt[elt] if self.intern else elt):
+                    junk.add(elt)
+            for elt in junk:  # separate loop avoids separate list of keys
+                junkpos.extend(b2j[elt])
+                del b2j[elt]
+            junkpos.sort()
+
+        # Purge popular elements that are not junk
+        popular: Set[Any] = set()
+        len_b = len(seq_b)
+        if self.autojunk and len_b >= 200:
+            ntest = len_b // 100 + 1
+            for elt, idxs in b2j.items():
+                if len(idxs) > ntest:
+                    popular.add(elt)
+            for elt in popular:  # ditto; as fast for 1% deletion
+                del b2j[elt]
+        return b2j, junk, popular, junkpos
+
+    # pylint: disable=too-many-locals
+    def __chain_b_compact(self) -> Tuple[Mapping[Any, Sequence[int]],
+                                         Set[Any], Set[Any], List[int]]:
+        # Same as __chain_b, but b2j is a _CompactIndex.  One pass counts
+        # the elements, junk and popular ones are dropped from the counts,
+        # and a second pass drops every index straight into its slot of
+        # one flat array -- no list per element, no int object per index;
+        # with NumPy, that pass is a stable sort of the groups instead.
+        seq_b = self.codes
+        counts: Dict[Any, int] = Counter(seq_b)
+
+        junk: Set[Any] = set()
+        isjunk = self.isjunk
+        if isjunk:
+            id2elt = self.id2elt
+            for elt in counts:
+                if isjunk(id2elt[elt] if self.intern else elt):
+                    junk.add(elt)
+            for elt in junk:
+                del counts[elt]
+
+        popular: Set[Any] = set()
+        len_b = len(seq_b)
+        if self.autojunk and len_b >= 200:
+            ntest = len_b // 100 + 1
+            for elt, count in counts.items():
+                if count > ntest:
+                    popular.add(elt)
+            for elt in popular:
+                del counts[elt]
+
+        groups: Dict[Any, int] = {}
+        offsets = array('q', [0])
+        for group, (elt, count) in enumerate(counts.items()):
+            groups[elt] = group
+            offsets.append(offsets[-1] + count)
+        # the group of every element of b, -1 for those left out, taken
+        # one at a time rather than into a list first
+        ids = map(groups.get, seq_b, repeat(-1))
+        if _np is not None:
+            # a stable sort of the groups puts the indices of each in
+            # order, after those left out
+            order = _np.argsort(_np.fromiter(ids, dtype=_np.int32,
+                                             count=len_b), kind='stable')
+            indices = array('q')
+            indices.frombytes(order[len_b - offsets[-1]:].astype(
+                _np.int64, copy=False).data.cast('B'))
+            del order
+        else:
+            cursors = offsets.tolist()
+            indices = array('q', bytes(8 * offsets[-1]))
+            for i, found in enumerate(ids):
+                if found >= 0:
+                    indices[cursors[found]] = i
+                    cursors[found] += 1
+        junkpos = [i for i, elt in _enumerate(seq_b)
+                   if elt in junk] if junk else []
+        return _CompactIndex(groups, offsets, indices), junk, popular, junkpos
+
+
+class CacheInfo(NamedTuple):
+    """Statistics of a BIndexCache."""
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class BIndexCache:
+    """A size-bounded, least-recently-used cache of BIndex objects.
+
+    get(b, ...) returns the BIndex of a sequence equal to b that was
+    indexed with the same isjunk, autojunk, intern and compact settings,
+    if there's one in the cache, and indexes b otherwise.  Entries are
+    keyed by a fingerprint of the contents of b (its type, length and
+    the hash of its elements), and a hit is checked with == against the
+    sequence indexed, so a sequence modified after it was indexed is
+    simply not found again.  Once more than maxsize indexes are cached,
+    the least recently used ones are dropped.
+
+    It's safe to use from several threads.  BINDEX_CACHE is one for the
+    whole process; pass it as the cache argument of SequenceMatcher,
+    Differ, UDiff.unified_diff, CDiff.context_diff or
+    Util.get_close_matches to have them reuse indexes:
+
+    >>> cache = BIndexCache(maxsize=2)
+    >>> s = SequenceMatcher(None, "abcd", "bcde", cache=cache)
+    >>> t = SequenceMatcher(None, "bcdf", "bcde", cache=cache)
+    >>> s.bindex is t.bindex
+    True
+    >>> cache.info()
+    CacheInfo(hits=1, misses=1, evictions=0, maxsize=2, currsize=1)
+    """
+
+    def __init__(self, maxsize: int = _CACHE_SIZE):
+        # Members:
+        # maxsize
+        #      the number of indexes kept at most
+        # hits, misses, evictions
+        #      counts of lookups answered from the cache, of lookups that
+        #      had to index the sequence, and of indexes dropped
+        # _entries
+        #      the cached indexes by key, least recently used first
+        # _lock
+        #      held while _entries or the counts are touched
+        if maxsize < 0:
+            raise ValueError("maxsize must be >= 0: %r" % (maxsize,))
+        self.maxsize = maxsize
+        self.hits = self.misses = self.evictions = 0
+        self._entries: 'OrderedDict[Tuple[Any, ...], BIndex[Any]]' = (
+            OrderedDict())
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(seq_b: Sequence[Any]) -> Tuple[Any, ...]:
+        """Return a hashable fingerprint of the contents of seq_b."""
+        if isinstance(seq_b, (str, bytes, tuple)):
+            return type(seq_b), len(seq_b), hash(seq_b)
+        if isinstance(seq_b, array):
+            # hash the raw buffer rather than an int object per element
+            return (type(seq_b), len(seq_b), seq_b.typecode,
+                    hash(seq_b.tobytes()))
+        if _np is not None and isinstance(seq_b, _np.ndarray):
+            return (type(seq_b), len(seq_b), seq_b.dtype.str,
+                    hash(_np.ascontiguousarray(seq_b).tobytes()))
+        return type(seq_b), len(seq_b), hash(tuple(seq_b))
+
+    @staticmethod
+    def _same(seq_a: Sequence[Any], seq_b: Sequence[Any]) -> bool:
+        # Whether seq_a and seq_b have equal elements; NumPy arrays don't
+        # compare to a single truth value with ==.
+        if len(seq_a) != len(seq_b):
+            return False
+        if _np is not None and isinstance(seq_a, _np.ndarray):
+            return bool(_np.array_equal(seq_a, seq_b))
+        return bool(seq_a == seq_b)
+
+    # pylint: disable=too-many-arguments
+    def get(self,
+            seq_b: Sequence[TElem],
+            isjunk: Optional[Callable[[TElem], bool]] = None,
+            autojunk: bool = True,
+            intern: bool = False,
+            compact: bool = False,
+            lazy: bool = False) -> BIndex[TElem]:
+        """Return a BIndex of seq_b with those settings, from the cache
+        if possible.  The arguments are those of BIndex.
+
+        array.array and NumPy arrays are fingerprinted by their raw
+        bytes, and compared as arrays:
+
+        >>> cache = BIndexCache()
+        >>> b = (_np.arange(300) if _np is not None
+        ...      else array('q', range(300)))
+        >>> cache.get(b) is cache.get(b[:])
+        True
+        """
+
+        key = (self.fingerprint(seq_b), isjunk, autojunk, intern, compact)
+        with self._lock:
+            bindex = self._entries.get(key)
+            if bindex is not None and self._same(bindex.seq_b, seq_b):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return bindex
+            self.misses += 1
+        # index outside the lock, so that other lookups needn't wait
+        bindex = BIndex(seq_b, isjunk, autojunk, intern, compact, lazy)
+        with self._lock:
+            self._entries[key] = bindex
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return bindex
+
+    def info(self) -> CacheInfo:
+        """Return the hit, miss and eviction counts, and the size."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions,
+                             self.maxsize, len(self._entries))
+
+    def clear(self) -> None:
+        """Drop all cached indexes and reset the counts."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+BINDEX_CACHE = BIndexCache()
+
+
+# pylint: disable=too-many-instance-attributes, too-many-public-methods
 class SequenceMatcher(Generic[TElem]):
 
     """
@@ -224,6 +1484,13 @@ class SequenceMatcher(Generic[TElem]):
     See also function get_close_matches() in this module, which shows how
     simple code building on SequenceMatcher can be used to do useful work.
 
+    Elements are compared with ==, except that when a and b are both
+    lists, tuples, strs or bytes, runs of equal elements are compared a
+    slice at a time, and a slice comparison -- like a dict lookup --
+    takes an element to be equal to itself without calling __eq__.  That
+    only makes a difference for elements that aren't equal to
+    themselves, such as float('nan'), which may then match.
+
     Timing:  Basic R-O is cubic time worst case and quadratic time expected
     case.  SequenceMatcher is quadratic time for the worst case and has
     expected-case behavior dependent in a complicated way on how many
@@ -243,6 +1510,18 @@ class SequenceMatcher(Generic[TElem]):
     set_seq2(b)
         Set the second sequence to be compared.
 
+    set_bindex(bindex)
+        Set the second sequence to be compared, already indexed.
+
+    edit_seq1(lo, hi, new)
+        Replace a[lo:hi] by new, updating the matches incrementally.
+
+    edit_seq2(lo, hi, new)
+        Replace b[lo:hi] by new, updating the matches incrementally.
+
+    extend_seq2(new)
+        Append new to b, growing the index of b in place.
+
     find_longest_match(alo, ahi, blo, bhi)
         Find longest matching block in a[alo:ahi] and b[blo:bhi].
 
@@ -252,6 +1531,9 @@ class SequenceMatcher(Generic[TElem]):
     get_opcodes()
         Return list of 5-tuples describing how to turn a into b.
 
+    iter_opcodes()
+        Generate the same 5-tuples as soon as each is known.
+
     ratio()
         Return a measure of the sequences' similarity (float in [0,1]).
 
@@ -260,14 +1542,26 @@ class SequenceMatcher(Generic[TElem]):
 
     real_quick_ratio()
         Return an upper bound on ratio() very quickly.
+
+    lcs_ratio()
+        Return a similarity based on the longest common subsequence.
     """
 
-    def __init__(
+    def __init__(  # pylint: disable=too-many-arguments
             self,
             isjunk: Optional[Callable[[TElem], bool]] = None,
             a: Sequence[TElem] = None,
             b: Sequence[TElem] = None,
-            autojunk: bool = True):
+            autojunk: bool = True,
+            algorithm: TAlgo = Algorithm.Default,
+            intern: bool = False,
+            compact: bool = False,
+            kernel: TKernel = Kernel.Dict,
+            memory_budget: int = _MEMORY_BUDGET,
+            cache: Optional[BIndexCache] = None,
+            limits: Optional[CostLimits] = None,
+            cancel: Optional[CancelToken] = None,
+            progress: Optional[Callable[[int, int], None]] = None):
         """Construct a SequenceMatcher.
 
         Optional arg isjunk is None (the default), or a one-argument
@@ -289,6 +1583,108 @@ class SequenceMatcher(Generic[TElem]):
         Optional arg autojunk should be set to False to disable the
         "automatic junk heuristic" that treats popular elements as junk
         (see module documentation for more information).
+
+        Optional arg algorithm selects the engine get_matching_blocks()
+        uses.  Algorithm.Default (the default) is the Ratcliff-Obershelp
+        style search built on find_longest_match().  Algorithm.Myers is
+        the O((N+M)D) greedy algorithm of Myers' "An O(ND) Difference
+        Algorithm and Its Variations"; it finds a longest common
+        subsequence, so it's very fast when the sequences differ in only
+        a few places, but it ignores isjunk and autojunk, and b2j isn't
+        built for it:
+
+        >>> a, b = "abcabba", "cbabac"
+        >>> s = SequenceMatcher(None, a, b, algorithm=Algorithm.Myers)
+        >>> ''.join(a[pos_a:pos_a + size]
+        ...         for pos_a, _, size in s.get_matching_blocks())
+        'caba'
+
+        Algorithm.Patience anchors on elements occurring exactly once in
+        each sequence (junk excepted), links the anchors by a longest
+        increasing subsequence and recurses between them, falling back to
+        find_longest_match() where there is nothing unique to anchor on;
+        it's near O(n log n) on typical data and isn't thrown off by
+        popular elements:
+
+        >>> a, b = "xy" * 60 + "q" + "xy" * 60, "xy" * 60 + "r" + "xy" * 60
+        >>> SequenceMatcher(None, a, b).get_matching_blocks()[:-1]
+        [Match(a=0, b=0, size=120)]
+        >>> s = SequenceMatcher(None, a, b, algorithm=Algorithm.Patience)
+        >>> s.get_matching_blocks()[:-1]
+        [Match(a=0, b=0, size=120), Match(a=121, b=121, size=120)]
+
+        Algorithm.Hirschberg finds the same kind of
+        shortest edit script as Algorithm.Myers, in linear space: it
+        splits the problem at the "middle snake" of the edit graph,
+        Hirschberg style, until a piece is small enough for the plain
+        Myers algorithm to solve within memory_budget bytes; b2j isn't
+        even built unless find_longest_match() is called.  It's meant for
+        huge sequences:
+
+        >>> a, b = "abcabba" * 3, "cbabac" * 3
+        >>> s = SequenceMatcher(None, a, b, algorithm=Algorithm.Hirschberg,
+        ...                     memory_budget=64)
+        >>> s.ratio() == SequenceMatcher(None, a, b,
+        ...                              algorithm=Algorithm.Myers).ratio()
+        True
+
+        Algorithm.Auto picks the algorithm, kernel and
+        intern for every pair of sequences from a look at a sample of
+        them -- their sizes, how many distinct and popular elements they
+        have, whether a few edits turn a into b, and the elements' types
+        -- and records the pick in .strategy; the kernel and intern
+        arguments are ignored then:
+
+        >>> a = ['line %d' % i for i in range(1000)]
+        >>> b = a[:500] + ['changed'] + a[501:]
+        >>> s = SequenceMatcher(None, a, b, algorithm=Algorithm.Auto)
+        >>> s.get_opcodes()[1]
+        (Replace, 500, 501, 500, 501)
+        >>> s.strategy.algorithm
+        myers
+
+        A string such as "myers" is accepted as an algorithm as well.
+
+        Optional arg intern should be set to True to map every distinct
+        element of b to a small int once, in set_seq2(), and every element
+        of a to the id of its equal in b (or -1) in set_seq1(); all the
+        matching then runs on the ids, so the elements' __hash__ and
+        __eq__ are called once per element instead of in every inner
+        loop.  That pays off for elements with Python-level __hash__ and
+        __eq__.  Note that b2j, bjunk, bpopular and fullbcount are keyed by
+        the ids then.
+
+        Optional arg compact should be set to True to keep b2j as a
+        read-only mapping over one flat array of indices into b, grouped
+        by element, instead of a dict of lists; for long sequences that
+        takes about half the memory when most elements are distinct, and
+        a fifth or less when they repeat a lot, and about as long to
+        build.
+
+        Optional arg kernel selects how find_longest_match() searches for
+        the longest junk-free block.  Kernel.Dict (the default) is the
+        pure-Python search.  Kernel.NumPy does the same search with NumPy
+        arrays, computing the run lengths along all diagonals in bulk
+        instead of one dict per element of a; it needs NumPy, and
+        integer-coded sequences (ints, array.array, NumPy int arrays, or
+        intern=True).  Kernel.Suffix builds a suffix automaton of b (once
+        per set_seq2 for the whole of b, and per call for a part of it)
+        and runs a through it, so every call is linear in the size of the
+        window even on repetitive data that the dict loop handles in
+        O(n*m) time when autojunk can't purge it.
+
+        Optional arg cache is a BIndexCache (such as BINDEX_CACHE) that
+        set_seq2() takes the BIndex of b from, so that a b compared again
+        and again isn't indexed again each time.
+
+        Optional arg limits is a CostLimits capping the work spent on
+        finding the matching blocks; if a cap is hit, the blocks are found
+        in a cheaper, coarser way, and .approximate is set to True.
+
+        Optional arg cancel is a CancelToken; computing the matching blocks
+        raises DiffCancelled soon after it is cancelled.  Optional arg
+        progress is a function called as progress(done, total) along the
+        way, where done of the total len(a) elements of a are settled.
         """
 
         # Members:
@@ -297,6 +1693,9 @@ class SequenceMatcher(Generic[TElem]):
         # b
         #      second sequence; differences are computed as "what do
         #      we need to do to 'a' to change it into 'b'?"
+        # bindex
+        #      the BIndex of b, which all of b2j, bjunk, bpopular,
+        #      bjunkpos, fullbcount and bmasks below are read from
         # b2j
         #      for x in b, b2j[x] is a list of the indices (into b)
         #      at which x appears; junk and popular elements do not appear
@@ -304,6 +1703,10 @@ class SequenceMatcher(Generic[TElem]):
         #      for x in b, fullbcount[x] == the number of times x
         #      appears in b; only materialized if really needed (used
         #      only for computing quick_ratio())
+        # bmasks
+        #      for x in b, bit j of bmasks[x] is set iff b[j] == x; only
+        #      materialized if really needed (used only for computing
+        #      lcs_ratio())
         # matching_blocks
         #      a list of (i, j, k) triples, where a[i:i+k] == b[j:j+k];
         #      ascending & non-overlapping in i and in j; terminated by
@@ -320,17 +1723,91 @@ class SequenceMatcher(Generic[TElem]):
         #      returning true iff the element is "junk" -- this has
         #      subtle but helpful effects on the algorithm, which I'll
         #      get around to writing up someday <0.9 wink>.
-        #      DON'T USE!  Only __chain_b uses this.  Use "in self.bjunk".
+        #      DON'T USE!  Only BIndex uses this.  Use "in self.bjunk".
         # bjunk
         #      the items in b for which isjunk is True.
         # bpopular
         #      nonjunk items in b treated as junk by the heuristic (if used).
+        # bjunkpos
+        #      the sorted indices (into b) of the junk items
+        # algorithm
+        #      the Algorithm used by get_matching_blocks
+        # intern
+        #      true iff the matcher works on interned ids of the elements
+        # compact
+        #      true iff b2j is a _CompactIndex rather than a dict of lists
+        # _a, _b
+        #      the sequences the matcher actually works on: a and b
+        #      themselves, or their interned ids
+        # kernel
+        #      the Kernel used by find_longest_match
+        # _np_a
+        #      a as an array for the NumPy kernel; built on first use
+        # _own_bindex
+        #      true iff bindex is the matcher's own copy, which
+        #      extend_seq2 grows in place
+        # _a_unknown
+        #      with intern, for x in a but not in b, the indices (into a)
+        #      at which x appears; built by extend_seq2 on first use
+        # _a_where
+        #      for x in a, the indices (into a) at which x appears; built
+        #      by extend_seq2 on first use
+        # memory_budget
+        #      bytes Algorithm.Hirschberg may spend on one Myers trace
+        # cache
+        #      the BIndexCache set_seq2 gets indexes from, or None
+        # limits
+        #      the CostLimits of the matcher, or None
+        # approximate
+        #      true iff a cost limit was hit computing matching_blocks
+        # _probes_left
+        #      the probes find_longest_match may still make, or None
+        # cancel
+        #      the CancelToken of the matcher, or None
+        # progress
+        #      the function told how far computing matching_blocks got,
+        #      or None
+        # _work_done
+        #      the elements of a settled so far computing matching_blocks
+        # auto
+        #      true iff the algorithm is Algorithm.Auto; algorithm, kernel
+        #      and intern are those picked for a and b then
+        # strategy
+        #      with auto, the Strategy picked for a and b, or None until
+        #      the matching blocks are looked for
 
         self.isjunk = isjunk
         self.seq_a: Sequence[TElem] = []  # None
         self.seq_b: Sequence[TElem] = []  # None
         self.autojunk = autojunk
-        self.set_seqs([] if a is None else a, [] if b is None else b)
+        self.algorithm = Algorithm(algorithm)
+        self.intern = intern
+        self.compact = compact
+        self.kernel = Kernel(kernel)
+        self.auto = self.algorithm is Algorithm.Auto
+        self.strategy: Optional[Strategy] = None
+        if self.auto:
+            self.algorithm, self.kernel = Algorithm.Default, Kernel.Dict
+        self.memory_budget = memory_budget
+        self.cache = cache
+        self.limits = limits
+        self.approximate = False
+        self._probes_left: Optional[int] = None
+        self.cancel = cancel
+        self.progress = progress
+        self._work_done = 0
+        if self.kernel is Kernel.NumPy and _np is None:
+            raise ImportError('kernel %r needs numpy' % (self.kernel,))
+        self._np_a: Any = None
+        self._a: Sequence[Any] = []
+        self._b: Sequence[Any] = []
+        self.bindex: BIndex[TElem]
+        self._own_bindex = False
+        self._a_unknown: Optional[Dict[TElem, List[int]]] = None
+        self._a_where: Optional[Dict[TElem, List[int]]] = None
+        # b first, so that a is interned, if at all, against its index
+        self.set_seq2([] if b is None else b)
+        self.set_seq1([] if a is None else a)
 
     def set_seqs(self, seq_a: Sequence[TElem], seq_b: Sequence[TElem]) -> None:
         """Set the two sequences to be compared.
@@ -368,9 +1845,15 @@ class SequenceMatcher(Generic[TElem]):
         if seq_a is self.seq_a:
             return
         self.seq_a = seq_a
+        self._a = self.__intern_a()
+        self._np_a = None
+        self._a_unknown = None
+        self._a_where = None
         # pylint: disable=attribute-defined-outside-init
         self.opcodes: Optional[List[OpCode]] = None
         self.matching_blocks: Optional[List[Match]] = None
+        self.approximate = False
+        self.strategy = None
 
     def set_seq2(self, seq_b: Sequence[TElem]) -> None:
         """Set the second sequence to be compared.
@@ -395,74 +1878,302 @@ class SequenceMatcher(Generic[TElem]):
 
         if seq_b is self.seq_b:
             return
-        self.seq_b = seq_b
-        # pylint: disable=attribute-defined-outside-init
-        self.opcodes = None
-        self.matching_blocks = None
-        self.fullbcount: Optional[Dict[TElem, int]] = None
-        self.__chain_b()
+        # Algorithm.Myers and Algorithm.Hirschberg don't need b2j and
+        # friends unless find_longest_match() is called, and
+        # Algorithm.Auto may not pick an algorithm that does
+        lazy = self.auto or self.algorithm in (Algorithm.Myers,
+                                               Algorithm.Hirschberg)
+        intern = (not _cheap_elements(seq_b)) if self.auto else self.intern
+        if self.cache is None:
+            self.set_bindex(BIndex(seq_b, self.isjunk, self.autojunk,
+                                   intern, self.compact, lazy))
+        else:
+            self.set_bindex(self.cache.get(seq_b, self.isjunk, self.autojunk,
+                                           intern, self.compact, lazy))
 
-    # For each element x in b, set b2j[x] to a list of the indices in
-    # b where x appears; the indices are in increasing order; note that
-    # the number of times x appears in b is len(b2j[x]) ...
-    # when self.isjunk is defined, junk elements don't show up in this
-    # map at all, which stops the central find_longest_match method
-    # from starting any matching block at a junk element ...
-    # b2j also does not contain entries for "popular" elements, meaning
-    # elements that account for more than 1 + 1% of the total elements, and
-    # when the sequence is reasonably large (>= 200 elements); this can
-    # be viewed as an adaptive notion of semi-junk, and yields an enormous
-    # speedup when, e.g., comparing program files with hundreds of
-    # instances of "return NULL;" ...
-    # note that this is only called when b changes; so for cross-product
-    # kinds of matches, it's best to call set_seq2 once, then set_seq1
-    # repeatedly
+    def set_bindex(self, bindex: 'BIndex[TElem]') -> None:
+        """Set the second sequence to be compared, already indexed.
+
+        The first sequence to be compared is not changed.
+
+        This is set_seq2(bindex.seq_b), except that bindex is used as it
+        is instead of indexing b again; isjunk, autojunk, intern and
+        compact are those bindex was built with.  A BIndex never changes,
+        so any number of matchers, in any number of threads, can share
+        it: to compare many sequences against one S concurrently, build
+        BIndex(S) once and give every worker its own SequenceMatcher with
+        .set_bindex() of it.
+
+        >>> index = BIndex("bcde")
+        >>> s = SequenceMatcher(None, "abcd")
+        >>> s.set_bindex(index)
+        >>> s.ratio()
+        0.75
+
+        See also set_seq2().
+        """
 
-    def __chain_b(self) -> None:
-        # Because isjunk is a user-defined (not C) function, and we test
-        # for junk a LOT, it's important to minimize the number of calls.
-        # Before the tricks described here, __chain_b was by far the most
-        # time-consuming routine in the whole module!  If anyone sees
-        # Jim Roskind, thank him again for profile.py -- I never would
-        # have guessed that.
-        # The first trick is to build b2j ignoring the possibility
-        # of junk.  I.e., we don't call isjunk at all yet.  Throwing
-        # out the junk later is much cheaper than building b2j "right"
-        # from the start.
-        assert self.seq_b is not None
-        seq_b = self.seq_b
         # pylint: disable=attribute-defined-outside-init
-        b2j: Dict[TElem, List[int]] = {}
-        self.b2j: Dict[TElem, List[int]] = b2j
+        self.bindex = bindex
+        self._own_bindex = False
+        self.seq_b = bindex.seq_b
+        self.isjunk, self.autojunk = bindex.isjunk, bindex.autojunk
+        self.intern, self.compact = bindex.intern, bindex.compact
+        self._b = bindex.codes
+        if self.intern or self._a is not self.seq_a:
+            self._a = self.__intern_a()
+            self._np_a = None
+            self._a_unknown = None
+        self.opcodes = None
+        self.matching_blocks = None
+        self.approximate = False
+        self.strategy = None
+
+    def edit_seq1(self,
+                  lo: int,
+                  hi: int,
+                  new: Sequence[TElem] = ()) -> None:
+        """Replace a[lo:hi] by the elements of new, and update what has
+        been computed so far to match.
+
+        lo == hi inserts new, and an empty new deletes a[lo:hi].  Matching
+        blocks are only looked for again in the part of a and b between
+        the blocks left intact on either side of the edit, so the cost
+        goes with the size of the edit and of the differences around it,
+        not with the size of the sequences:
+
+        >>> s = SequenceMatcher(None, "abcdefgh", "abcdXfgh")
+        >>> s.get_matching_blocks()[:-1]
+        [Match(a=0, b=0, size=4), Match(a=5, b=5, size=3)]
+        >>> s.edit_seq1(4, 5, "X")
+        >>> s.get_matching_blocks()[:-1]
+        [Match(a=0, b=0, size=8)]
+
+        The result always describes a and b correctly, but, junk and
+        popular elements being judged in that part alone, it may differ
+        from the one of a matcher set up with the edited sequence.
+
+        See also edit_seq2().
+        """
 
-        for i, elt in _enumerate(seq_b):
-            indices = b2j.setdefault(elt, [])
-            indices.append(i)
+        if not 0 <= lo <= hi <= len(self.seq_a):
+            raise ValueError('bad edit range [%r:%r] of %d elements' %
+                             (lo, hi, len(self.seq_a)))
+        self.seq_a = _spliced(self.seq_a, lo, hi, new)
+        if self.intern:
+            b2idget = self.bindex.b2id.get
+            self._a = _spliced(self._a, lo, hi,
+                               [b2idget(elt, -1) for elt in new])
+        else:
+            self._a = self.seq_a
+        self._np_a = None
+        self._a_unknown = None
+        self._a_where = None
+        self.__update_blocks(0, lo, hi, len(new))
+
+    def edit_seq2(self,
+                  lo: int,
+                  hi: int,
+                  new: Sequence[TElem] = ()) -> None:
+        """Replace b[lo:hi] by the elements of new, and update what has
+        been computed so far to match.
+
+        The index of b is replaced by bindex.edit(lo, hi, new), which
+        leaves the old one intact for whoever else uses it.  Otherwise,
+        the same as edit_seq1().
+        """
 
-        # Purge junk elements
-        junk: Set[TElem] = set()
-        self.bjunk: Set[TElem] = junk
-        isjunk = self.isjunk
-        if isjunk:
-            for elt in b2j:
-                if isjunk(elt):
-                    junk.add(elt)
-            for elt in junk:  # separate loop avoids separate list of keys
-                del b2j[elt]
+        bindex = self.bindex.edit(lo, hi, new)
+        grown = len(bindex.b2id) > len(self.bindex.b2id)
+        self.bindex = bindex
+        self._own_bindex = False
+        self.seq_b = bindex.seq_b
+        self._b = bindex.codes
+        if grown:
+            # elements of a may have got ids now
+            self._a = self.__intern_a()
+            self._np_a = None
+            self._a_unknown = None
+        self.__update_blocks(1, lo, hi, len(new))
+
+    def extend_seq2(self, new: Sequence[TElem]) -> None:
+        """Append the elements of new to b, and update what has been
+        computed so far to match.
+
+        The index of b is grown in place rather than built again: new
+        indices are appended to b2j, and the autojunk threshold is kept
+        up to date as b grows, so that b2j, bjunk and bpopular are just
+        as set_seq2() of the longer b would make them, at a constant cost
+        per element appended, amortized.  Matching blocks are only looked
+        for again after the last one, as for edit_seq2(), and no further
+        back in b than a few thousand elements before new: what lies
+        further back already turned out to have nothing in common with
+        the rest of a.  In a, they are only looked for up to the first
+        places after the last block of the elements of that part of b
+        (found in an index of a built on the first call), and a little
+        beyond.  So the cost of a call goes with the size of new and how
+        far ahead in a it turns up, not with the size of a or b:
+
+        >>> s = SequenceMatcher(None, "abcdef", "abc")
+        >>> s.ratio()
+        0.6666666666666666
+        >>> s.extend_seq2("def")
+        >>> s.ratio()
+        1.0
 
-        # Purge popular elements that are not junk
-        popular: Set[TElem] = set()
-        self.bpopular: Set[TElem] = popular
-        len_b = len(seq_b)
-        if self.autojunk and len_b >= 200:
-            ntest = len_b // 100 + 1
-            for elt, idxs in b2j.items():
-                if len(idxs) > ntest:
-                    popular.add(elt)
-            for elt in popular:  # ditto; as fast for 1% deletion
-                del b2j[elt]
+        The first call makes a list copy of b, and a copy of its index,
+        for the matcher's own use; from then on, b (and .bindex) is that
+        copy, which changes with each call, so don't share it.
+        """
 
-    def find_longest_match(self,  # pylint: disable=too-many-locals
+        if not new:
+            return
+        if not self._own_bindex:
+            # pylint: disable=protected-access
+            self.bindex = self.bindex._extendable()
+            self._own_bindex = True
+            self.seq_b = self.bindex.seq_b
+            self._b = self.bindex.codes
+            self.compact = False
+            if self.intern:
+                self._a = self.__intern_a()
+                self._a_unknown = None
+        start = len(self.seq_b)
+        known = len(self.bindex.id2elt)
+        self.bindex._append(new)  # pylint: disable=protected-access
+        if len(self.bindex.id2elt) > known:
+            self.__intern_a_again(known)
+        self._np_a = None
+        self.__update_blocks(1, start, start, len(new), _APPEND_REACH)
+
+    def __a_reach(self, alo: int, ahi: int, blo: int, bhi: int) -> int:
+        # How far into a[alo:ahi] extend_seq2 looks for b[blo:bhi]: past
+        # the first place there of each element of b[blo:bhi], by room
+        # for a run of all of them.
+        if self._a_where is None:
+            where: Dict[TElem, List[int]] = {}
+            for pos_a, elt in enumerate(self.seq_a):
+                where.setdefault(elt, []).append(pos_a)
+            self._a_where = where
+        nothing: List[int] = []
+        reach = alo
+        for elt in set(self.seq_b[blo:bhi]):
+            found = self._a_where.get(elt, nothing)
+            first = bisect_left(found, alo)
+            if first < len(found) and found[first] >= reach:
+                reach = found[first] + 1
+        if reach == alo:
+            return alo
+        return min(reach + bhi - blo, ahi)
+
+    def __intern_a_again(self, known: int) -> None:
+        # b got ids known and up; give them to the elements of a equal to
+        # those, which had -1 so far.
+        if self._a_unknown is None:
+            unknown: Dict[TElem, List[int]] = {}
+            for pos_a, code in _enumerate(self._a):
+                if code < 0:
+                    unknown.setdefault(self.seq_a[pos_a], []).append(pos_a)
+            self._a_unknown = unknown
+        seq_a = self._a
+        assert isinstance(seq_a, list)
+        for code, elt in enumerate(self.bindex.id2elt[known:], known):
+            for pos_a in self._a_unknown.pop(elt, ()):
+                seq_a[pos_a] = code
+
+    # pylint: disable=too-many-locals, too-many-arguments
+    def __update_blocks(self, side: int, lo: int, hi: int, size: int,
+                        reach: Optional[int] = None) -> None:
+        # Side 0 (a) or 1 (b) had [lo:hi] replaced by size elements.
+        # Blocks clear of the edit stay, shifted if after it; blocks
+        # overlapping it are cut back to the parts clear of it, and the
+        # gap left between the last block before the edit and the first
+        # one after it is matched afresh -- on side b, from no more than
+        # reach elements before the edit, if reach is given, and then on
+        # side a only as far as __a_reach() has it.
+        # pylint: disable=attribute-defined-outside-init
+        self.opcodes = None
+        if self.matching_blocks is None:
+            return
+        delta = size - (hi - lo)
+        head: List[Match] = []
+        tail: List[Match] = []
+        for block in self.matching_blocks[:-1]:
+            start = block[side]
+            end = start + block.size
+            if end <= lo:
+                head.append(block)
+                continue
+            if start < lo:
+                head.append(Match(block.a, block.b, lo - start))
+            if end > hi:
+                cut = max(hi - start, 0)
+                tail.append(Match(block.a + cut + (0 if side else delta),
+                                  block.b + cut + (delta if side else 0),
+                                  block.size - cut))
+        len_a, len_b = len(self.seq_a), len(self.seq_b)
+        alo, blo = ((head[-1].a + head[-1].size, head[-1].b + head[-1].size)
+                    if head else (0, 0))
+        ahi, bhi = (tail[0].a, tail[0].b) if tail else (len_a, len_b)
+        if side and reach is not None:
+            blo = max(blo, lo - reach)
+            if blo < bhi:
+                ahi = self.__a_reach(alo, ahi, blo, bhi)
+        middle: List[Match] = []
+        if alo < ahi and blo < bhi:
+            gap = SequenceMatcher(self.bindex.isjunk,
+                                  self.seq_a[alo:ahi], self.seq_b[blo:bhi],
+                                  self.autojunk, algorithm=self.algorithm,
+                                  intern=self.intern, kernel=self.kernel,
+                                  memory_budget=self.memory_budget,
+                                  limits=self.limits, cancel=self.cancel)
+            middle = [Match(alo + pos_a, blo + pos_b, length)
+                      for pos_a, pos_b, length
+                      in gap.get_matching_blocks()[:-1]]
+            self.approximate = self.approximate or gap.approximate
+        self.matching_blocks = _collapsed(head + middle + tail, len_a, len_b)
+
+    @property
+    def b2j(self) -> Mapping[Any, Sequence[int]]:
+        """For x in b, the indices (into b) at which x appears."""
+        return self.bindex.b2j
+
+    @property
+    def bjunk(self) -> Set[Any]:
+        """The items in b for which isjunk is True."""
+        return self.bindex.bjunk
+
+    @property
+    def bpopular(self) -> Set[Any]:
+        """Nonjunk items in b treated as junk by the heuristic."""
+        return self.bindex.bpopular
+
+    @property
+    def bjunkpos(self) -> List[int]:
+        """The sorted indices (into b) of the junk items."""
+        return self.bindex.bjunkpos
+
+    @property
+    def fullbcount(self) -> Dict[Any, int]:
+        """For x in b, the number of times x appears in b."""
+        return self.bindex.fullbcount
+
+    @property
+    def bmasks(self) -> Dict[Any, int]:
+        """For x in b, an int whose bit j is set iff b[j] == x."""
+        return self.bindex.bmasks
+
+    def __intern_a(self) -> Sequence[Any]:
+        # Elements of a that don't occur in b can't match anything, so
+        # they all share the id -1 and the table never grows here.
+        if not self.intern:
+            return self.seq_a
+        b2idget = self.bindex.b2id.get
+        return [b2idget(elt, -1) for elt in self.seq_a]
+
+    # pylint: disable=too-many-locals, too-many-branches
+    # pylint: disable=too-many-statements
+    def find_longest_match(self,
                            alo: int,
                            ahi: int,
                            blo: int,
@@ -524,44 +2235,92 @@ class SequenceMatcher(Generic[TElem]):
 
         assert self.seq_a is not None
         assert self.seq_b is not None
-        seq_a, seq_b, b2j, isbjunk = (
-            self.seq_a, self.seq_b, self.b2j, self.bjunk.__contains__)
+        # pylint: disable=protected-access
+        b2j, bjunk, _, junkpos = self.bindex._chain()
+        seq_a, seq_b, isbjunk = self._a, self._b, bjunk.__contains__
         besti, bestj, bestsize = alo, blo, 0
+        budget = self._probes_left
+        kernel = self.kernel
+        if kernel is Kernel.NumPy and ahi - alo < _NUMPY_MIN_ROWS:
+            kernel = Kernel.Dict
+        if budget and kernel is not Kernel.Dict:
+            # the kernels can't stop half way, so they're charged up
+            # front what the dict loop would be; if that's more than is
+            # left, the dict loop uses up the rest instead
+            cost = self.__probes_in(alo, ahi, blo, bhi)
+            if cost > budget:
+                kernel = Kernel.Dict
+            else:
+                budget -= cost
         # find longest junk-free match
-        # during an iteration of the loop, j2len[j] = length of longest
-        # junk-free match ending with seq_a[i-1] and seq_b[j]
-        j2len: Dict[int, int] = {}
-        nothing: List[int] = []
-        for pos_a in range(alo, ahi):
-            # look at all instances of seq_a[pos_a] in seq_b; note that because
-            # b2j has no junk keys, the loop is skipped if seq_a[pos_a] is junk
-            j2lenget = j2len.get
-            newj2len = {}
-            for pos_b in b2j.get(seq_a[pos_a], nothing):
-                # seq_a[pos_a] matches seq_b[pos_b]
-                if pos_b < blo:
-                    continue
-                if pos_b >= bhi:
+        if budget == 0:
+            # out of probes: settle for a greedy match
+            self.approximate = True
+            besti, bestj, bestsize = self.__greedy_longest(alo, ahi,
+                                                           blo, bhi)
+        elif kernel is Kernel.NumPy:
+            besti, bestj, bestsize = self._numpy_longest(alo, ahi, blo, bhi)
+        elif kernel is Kernel.Suffix:
+            besti, bestj, bestsize = self._suffix_longest(alo, ahi, blo, bhi)
+        else:
+            # every (i, j) pair and every row is charged a probe; without
+            # a limit, there are always plenty left
+            probes = sys.maxsize if budget is None else budget
+            # during an iteration of the loop, j2len[j] = length of longest
+            # junk-free match ending with seq_a[i-1] and seq_b[j]
+            j2len: Dict[int, int] = {}
+            nothing: List[int] = []
+            for pos_a in range(alo, ahi):
+                # look at all instances of seq_a[pos_a] in seq_b; note that
+                # because b2j has no junk keys, the loop is skipped if
+                # seq_a[pos_a] is junk
+                j2lenget = j2len.get
+                newj2len = {}
+                for pos_b in b2j.get(seq_a[pos_a], nothing):
+                    # seq_a[pos_a] matches seq_b[pos_b]
+                    if pos_b < blo:
+                        continue
+                    if pos_b >= bhi:
+                        break
+                    newlen = newj2len[pos_b] = j2lenget(pos_b-1, 0) + 1
+                    if newlen > bestsize:
+                        besti = pos_a - newlen + 1
+                        bestj = pos_b - newlen + 1
+                        bestsize = newlen
+                j2len = newj2len
+                probes -= len(j2len) + 1
+                if probes <= 0:
+                    # settle for the best so far
+                    probes = 0
+                    self.approximate = self.approximate or pos_a + 1 < ahi
                     break
-                newlen = newj2len[pos_b] = j2lenget(pos_b-1, 0) + 1
-                if newlen > bestsize:
-                    besti = pos_a - newlen + 1
-                    bestj = pos_b - newlen + 1
-                    bestsize = newlen
-            j2len = newj2len
+            if budget is not None:
+                budget = probes
+        self._probes_left = budget
 
         # Extend the best by non-junk elements on each end.  In particular,
         # "popular" non-junk elements aren't in b2j, which greatly speeds
         # the inner loop above, but also means "the best" match so far
         # doesn't contain any junk *or* popular non-junk elements.
-        while (besti > alo and bestj > blo and
-               not isbjunk(seq_b[bestj - 1]) and
-               seq_a[besti - 1] == seq_b[bestj - 1]):
-            besti, bestj, bestsize = besti - 1, bestj - 1, bestsize + 1
-        while (besti + bestsize < ahi and bestj + bestsize < bhi and
-               not isbjunk(seq_b[bestj + bestsize]) and
-               seq_a[besti + bestsize] == seq_b[bestj + bestsize]):
-            bestsize += 1
+        # Long stretches are compared a slice at a time; the nearest junk
+        # in b on either side bounds how far they may go.
+        if besti > alo and bestj > blo and (
+                seq_a[besti - 1] == seq_b[bestj - 1]):
+            nearest = bisect_left(junkpos, bestj)
+            prevjunk = junkpos[nearest - 1] if nearest else -1
+            size = _backward_run(seq_a, besti, seq_b, bestj,
+                                 min(besti - alo, bestj - blo,
+                                     bestj - prevjunk - 1))
+            besti, bestj, bestsize = (besti - size, bestj - size,
+                                      bestsize + size)
+        if besti + bestsize < ahi and bestj + bestsize < bhi and (
+                seq_a[besti + bestsize] == seq_b[bestj + bestsize]):
+            nearest = bisect_left(junkpos, bestj + bestsize)
+            nextjunk = junkpos[nearest] if nearest < len(junkpos) else bhi
+            bestsize += _forward_run(seq_a, besti + bestsize,
+                                     seq_b, bestj + bestsize,
+                                     min(ahi - besti, bhi - bestj,
+                                         nextjunk - bestj) - bestsize)
 
         # Now that we have a wholly interesting match (albeit possibly
         # empty!), we may as well suck up the matching junk on each
@@ -581,6 +2340,205 @@ class SequenceMatcher(Generic[TElem]):
 
         return Match(besti, bestj, bestsize)
 
+    def __probes_in(self, alo: int, ahi: int, blo: int, bhi: int) -> int:
+        # The probes the dict loop of find_longest_match() makes in the
+        # window: one per row, and one per (i, j) pair.
+        b2j, seq_a = self.b2j, self._a
+        nothing: List[int] = []
+        probes = ahi - alo
+        for pos_a in range(alo, ahi):
+            found = b2j.get(seq_a[pos_a], nothing)
+            if found:
+                probes += (bisect_left(found, bhi) -
+                           bisect_left(found, blo))
+        return probes
+
+    def __greedy_longest(self,
+                         alo: int,
+                         ahi: int,
+                         blo: int,
+                         bhi: int) -> Tuple[int, int, int]:
+        # A junk-free matching block of a[alo:ahi] and b[blo:bhi] found
+        # in O((ahi - alo) log len(b)) time: the longest of the runs that
+        # start at the first place in b[blo:bhi] of an element of a,
+        # skipping past each run found.
+        b2j, junkpos = self.b2j, self.bjunkpos
+        seq_a, seq_b = self._a, self._b
+        nothing: List[int] = []
+        besti, bestj, bestsize = alo, blo, 0
+        pos_a = alo
+        while pos_a < ahi:
+            found = b2j.get(seq_a[pos_a], nothing)
+            first = bisect_left(found, blo)
+            if first == len(found) or found[first] >= bhi:
+                pos_a += 1
+                continue
+            pos_b = found[first]
+            nearest = bisect_left(junkpos, pos_b)
+            end_b = bhi
+            if nearest < len(junkpos):
+                end_b = min(junkpos[nearest], bhi)
+            size = _forward_run(seq_a, pos_a, seq_b, pos_b,
+                                min(ahi - pos_a, end_b - pos_b))
+            if size > bestsize:
+                besti, bestj, bestsize = pos_a, pos_b, size
+            pos_a += size
+        return besti, bestj, bestsize
+
+    def __greedy_blocks(self,
+                        alo: int,
+                        ahi: int,
+                        blo: int,
+                        bhi: int) -> List[Match]:
+        # Unsorted matching blocks of a[alo:ahi] and b[blo:bhi] found by
+        # __greedy_longest() divide and conquer: the cheap way out when a
+        # cost limit is hit.
+        queue = [(alo, ahi, blo, bhi)]
+        matching_blocks: List[Match] = []
+        while queue:
+            self.__poll()
+            alo, ahi, blo, bhi = queue.pop()
+            pos_a, pos_b, size = self.__greedy_longest(alo, ahi, blo, bhi)
+            if not size:
+                continue
+            matching_blocks.append(Match(pos_a, pos_b, size))
+            if alo < pos_a and blo < pos_b:
+                queue.append((alo, pos_a, blo, pos_b))
+            if pos_a + size < ahi and pos_b + size < bhi:
+                queue.append((pos_a + size, ahi, pos_b + size, bhi))
+        return matching_blocks
+
+    def __numpy_tables(self) -> Tuple[Any, Any, Any, Any]:
+        # The NumPy kernel's view of a and b2j, built on first use:
+        # codes_a is a as an int64 array, and the rest is
+        # BIndex.numpy_tables().
+        if self._np_a is None:
+            self._np_a = _as_int_array(self._a, 'a')
+        keys, positions, slots = self.bindex.numpy_tables()
+        return self._np_a, keys, positions, slots
+
+    # pylint: disable=too-many-locals
+    def _numpy_longest(self,
+                       alo: int,
+                       ahi: int,
+                       blo: int,
+                       bhi: int) -> Tuple[int, int, int]:
+        """Find longest junk-free matching block in a[alo:ahi] and
+        b[blo:bhi] with NumPy; the same block the dict loop of
+        find_longest_match() finds."""
+
+        codes_a, keys, positions, slots = self.__numpy_tables()
+        stride = len(self._b) + 1
+        # for every row of a, the part of b2j[a[i]] inside b[blo:bhi]
+        row_a = codes_a[alo:ahi]
+        ranks = _np.minimum(_np.searchsorted(keys, row_a),
+                            max(len(keys) - 1, 0))
+        present = (keys[ranks] == row_a) if len(keys) else (
+            _np.zeros(len(row_a), dtype=bool))
+        lows = _np.searchsorted(slots, ranks * stride + blo)
+        highs = _np.searchsorted(slots, ranks * stride + bhi)
+        counts = _np.where(present, highs - lows, 0)
+        ends = _np.cumsum(counts)
+
+        # every pair (i, j) is keyed by its diagonal, then i, so that the
+        # pairs of a run along a diagonal get consecutive keys once sorted
+        width = ahi - alo + 1
+        besti, bestj, bestsize = alo, blo, 0
+        carry_keys = carry_len = _np.zeros(0, dtype=_np.int64)
+        row = 0
+        while row < len(row_a):
+            # rows [row, stop) hold about _NUMPY_CHUNK (i, j) pairs
+            base = int(ends[row - 1]) if row else 0
+            stop = max(int(_np.searchsorted(ends, base + _NUMPY_CHUNK,
+                                            side='right')), row + 1)
+            chunk_counts = counts[row:stop]
+            total = int(ends[stop - 1]) - base
+            if not total:
+                carry_keys = carry_len = _np.zeros(0, dtype=_np.int64)
+                row = stop
+                continue
+            # i - alo, j of every pair, in row-major order
+            pos_a = _np.repeat(_np.arange(row, stop), chunk_counts)
+            firsts = _np.repeat(lows[row:stop] - (_np.cumsum(chunk_counts) -
+                                                  chunk_counts),
+                                chunk_counts)
+            pos_b = positions[firsts + _np.arange(total)]
+            pair_keys = _np.sort((pos_b - pos_a + (ahi - alo)) * width + pos_a)
+            del pos_a, pos_b, firsts
+
+            # runs of consecutive keys: where each starts, and how long
+            starts = _np.flatnonzero(_np.diff(pair_keys, prepend=-2) != 1)
+            spans = _np.diff(starts, append=total)
+            start_keys = pair_keys[starts]
+            end_keys = start_keys + spans - 1
+            lengths = spans
+            if len(carry_keys):
+                # runs may go on from the last row of the previous chunk
+                found = _np.minimum(_np.searchsorted(carry_keys,
+                                                     start_keys - 1),
+                                    len(carry_keys) - 1)
+                lengths = lengths + _np.where(
+                    carry_keys[found] == start_keys - 1, carry_len[found], 0)
+
+            size = int(lengths.max())
+            if size > bestsize:
+                # the dict loop keeps the longest run that ends first in
+                # row-major order: the lowest i, then the lowest j
+                ends_i = end_keys % width
+                longest = _np.flatnonzero(lengths == size)
+                first = longest[_np.lexsort((end_keys[longest] // width,
+                                             ends_i[longest]))[0]]
+                end_i = int(ends_i[first])
+                besti = alo + end_i - size + 1
+                bestj = int(end_keys[first] // width) - (ahi - alo) + (
+                    end_i - size + 1)
+                bestsize = size
+
+            last_row = end_keys % width == stop - 1
+            carry_keys, carry_len = end_keys[last_row], lengths[last_row]
+            row = stop
+        return besti, bestj, bestsize
+
+    def _suffix_longest(self,
+                        alo: int,
+                        ahi: int,
+                        blo: int,
+                        bhi: int) -> Tuple[int, int, int]:
+        """Find longest junk-free matching block in a[alo:ahi] and
+        b[blo:bhi] with a suffix automaton of b[blo:bhi]; the same block
+        the dict loop of find_longest_match() finds."""
+
+        seq_a, b2j = self._a, self.b2j
+        if blo == 0 and bhi == len(self._b):
+            automaton = self.bindex.suffix_automaton()
+        else:
+            automaton = _SuffixAutomaton(self._b, blo, bhi)
+        trans, link, length, first = (automaton.trans, automaton.link,
+                                      automaton.length, automaton.first)
+        besti, bestj, bestsize = alo, blo, 0
+        # state is the state of the longest suffix of a[alo:pos_a+1] that
+        # occurs in b[blo:bhi], and size its length; elements not in b2j
+        # (junk, popular, or not in b at all) can't be part of a match
+        state = size = 0
+        for pos_a in range(alo, ahi):
+            elt = seq_a[pos_a]
+            if elt not in b2j:
+                state = size = 0
+                continue
+            while state and elt not in trans[state]:
+                state = link[state]
+                size = length[state]
+            if elt in trans[state]:
+                state = trans[state][elt]
+                size += 1
+            if size > bestsize:
+                # every string of a state ends first at the same index
+                # of b, so that's the earliest occurrence
+                besti = pos_a - size + 1
+                bestj = first[state] - size + 1
+                bestsize = size
+        return besti, bestj, bestsize
+
     # pylint: disable=too-many-locals
     def get_matching_blocks(self) -> List[Match]:
         """Return list of triples describing matching subsequences.
@@ -609,17 +2567,64 @@ class SequenceMatcher(Generic[TElem]):
         if self.matching_blocks is not None:
             return self.matching_blocks
         len_a, len_b = len(self.seq_a), len(self.seq_b)
+        self.__pick_strategy()
+        self.__start_limits()
+
+        if self.algorithm is Algorithm.Myers:
+            matching_blocks = self._myers_blocks(0, len_a, 0, len_b)
+        elif self.algorithm is Algorithm.Patience:
+            matching_blocks = self._patience_blocks(0, len_a, 0, len_b)
+        elif self.algorithm is Algorithm.Hirschberg:
+            matching_blocks = self._hirschberg_blocks(0, len_a, 0, len_b)
+        else:
+            matching_blocks = self._longest_match_blocks(0, len_a, 0, len_b)
+        # pylint: disable=attribute-defined-outside-init
+        self.matching_blocks = _collapsed(matching_blocks, len_a, len_b)
+        if self.progress is not None:
+            self.progress(len_a, len_a)
+        return self.matching_blocks
+
+    def _longest_match_blocks(self,
+                              alo: int,
+                              ahi: int,
+                              blo: int,
+                              bhi: int) -> List[Match]:
+        """Return unsorted matching blocks of a[alo:ahi] and b[blo:bhi]
+        found by find_longest_match() divide and conquer."""
+
+        matching_blocks = self.__bounded_blocks(alo, ahi, blo, bhi, 0)
+        assert matching_blocks is not None
+        return matching_blocks
+
+    # pylint: disable=too-many-arguments
+    def __bounded_blocks(self,
+                         alo: int,
+                         ahi: int,
+                         blo: int,
+                         bhi: int,
+                         need: int) -> Optional[List[Match]]:
+        # _longest_match_blocks(), giving up and returning None as soon as
+        # the blocks can't add up to `need` matches any more.
 
         # This is most naturally expressed as a recursive algorithm, but
         # at least one user bumped into extreme use cases that exceeded
         # the recursion limit on their box.  So, now we maintain a list
         # ('queue`) of blocks we still need to look at, and append partial
-        # results to `matching_blocks` in a loop; the matches are sorted
-        # at the end.
-        queue = [(0, len_a, 0, len_b)]
+        # results to `matching_blocks` in a loop; the caller sorts the
+        # matches.  The elements of a in a window are counted as settled
+        # when it's taken off the queue, less those of the windows put
+        # back.
+        queue = [(alo, ahi, blo, bhi)]
         matching_blocks: List[Match] = []
+        # the windows on the queue have at most `pending` matches in all
+        found, pending = 0, min(ahi - alo, bhi - blo)
         while queue:
+            if found + pending < need:
+                return None
+            self.__poll()
             alo, ahi, blo, bhi = queue.pop()
+            self._work_done += ahi - alo
+            pending -= min(ahi - alo, bhi - blo)
             matched = self.find_longest_match(alo, ahi, blo, bhi)
             # - a[alo:matched.a] vs b[blo:matched.b] unknown
             # - a[matched.a:matched.a+matched.size] same as
@@ -629,42 +2634,338 @@ class SequenceMatcher(Generic[TElem]):
             # if matched.size is 0, there was no matching block
             if matched.size:
                 matching_blocks.append(matched)
+                found += matched.size
                 if alo < matched.a and blo < matched.b:
                     queue.append((alo, matched.a, blo, matched.b))
+                    self._work_done -= matched.a - alo
+                    pending += min(matched.a - alo, matched.b - blo)
                 if matched.a + matched.size < ahi and (
                         matched.b + matched.size < bhi):
                     queue.append((matched.a + matched.size,
                                   ahi,
                                   matched.b + matched.size,
                                   bhi))
-        matching_blocks.sort()
-
-        # It's possible that we have adjacent equal blocks in the
-        # matching_blocks list now.  Starting with 2.5, this code was added
-        # to collapse them.
-        pos_a1 = pos_b1 = size1 = 0
-        non_adjacent = []
-        for pos_a2, pos_b2, size2 in matching_blocks:
-            # Is this block adjacent to pos_a1, pos_b1, size1?
-            if pos_a1 + size1 == pos_a2 and pos_b1 + size1 == pos_b2:
-                # Yes, so collapse them -- this just increases the length of
-                # the first block by the length of the second, and the first
-                # block so lengthened remains the block to compare against.
-                size1 += size2
+                    self._work_done -= ahi - matched.a - matched.size
+                    pending += min(ahi - matched.a - matched.size,
+                                   bhi - matched.b - matched.size)
+        return matching_blocks
+
+    def __poll(self) -> None:
+        # Between two pieces of work: stop if cancelled, and report how
+        # far computing the matching blocks got.
+        if self.cancel is not None:
+            self.cancel.check()
+        if self.progress is not None:
+            self.progress(self._work_done, len(self.seq_a))
+
+    def _strip_common(self,
+                      alo: int,
+                      ahi: int,
+                      blo: int,
+                      bhi: int,
+                      matching_blocks: List[Match]) -> Tuple[int, int,
+                                                             int, int]:
+        """Append the common prefix and suffix of a[alo:ahi] and b[blo:bhi]
+        to matching_blocks, and return the window left between them."""
+
+        assert self.seq_a is not None
+        assert self.seq_b is not None
+        seq_a, seq_b = self._a, self._b
+        head = _forward_run(seq_a, alo, seq_b, blo, min(ahi - alo, bhi - blo))
+        if head:
+            matching_blocks.append(Match(alo, blo, head))
+            alo, blo = alo + head, blo + head
+        tail = _backward_run(seq_a, ahi, seq_b, bhi,
+                             min(ahi - alo, bhi - blo))
+        if tail:
+            matching_blocks.append(Match(ahi - tail, bhi - tail, tail))
+            ahi, bhi = ahi - tail, bhi - tail
+        return alo, ahi, blo, bhi
+
+    # pylint: disable=too-many-locals, too-many-branches
+    def _myers_blocks(self,
+                      alo: int,
+                      ahi: int,
+                      blo: int,
+                      bhi: int) -> List[Match]:
+        """Return unsorted matching blocks of a[alo:ahi] and b[blo:bhi]
+        along a shortest edit script found by Myers' greedy algorithm.
+
+        Only a and b themselves are looked at; b2j and friends aren't
+        even built, so isjunk is never called:
+
+        >>> calls = []
+        >>> s = SequenceMatcher(calls.append, "abxcd", "abcd",
+        ...                     algorithm=Algorithm.Myers)
+        >>> s.get_matching_blocks()[:-1]
+        [Match(a=0, b=0, size=2), Match(a=3, b=2, size=2)]
+        >>> calls
+        []
+        """
+
+        assert self.seq_a is not None
+        assert self.seq_b is not None
+        seq_a, seq_b = self._a, self._b
+        matching_blocks: List[Match] = []
+
+        # Common prefix and suffix are always part of a shortest edit
+        # script, and stripping them keeps D (and the trace) small.
+        alo, ahi, blo, bhi = self._strip_common(alo, ahi, blo, bhi,
+                                                matching_blocks)
+        len_a, len_b = ahi - alo, bhi - blo
+        if not (len_a and len_b):
+            return matching_blocks
+
+        # Forward pass: v[k] is the furthest x reached on diagonal k
+        # (k = x - y) with d edits.  A snapshot of v is kept for every d
+        # so that the path can be recovered; its size is O(D**2).
+        v: Dict[int, int] = {1: 0}
+        trace: List[Dict[int, int]] = []
+        max_edits = self.limits.edits if self.limits else None
+        for edits in range(len_a + len_b + 1):
+            self.__poll()
+            if max_edits is not None and edits > max_edits:
+                # too far apart: settle for greedy matches
+                # pylint: disable=attribute-defined-outside-init
+                self.approximate = True
+                matching_blocks.extend(self.__greedy_blocks(alo, ahi,
+                                                            blo, bhi))
+                return matching_blocks
+            for k in range(-edits, edits + 1, 2):
+                if k == -edits or (k != edits and v[k - 1] < v[k + 1]):
+                    pos_x = v[k + 1]
+                else:
+                    pos_x = v[k - 1] + 1
+                pos_y = pos_x - k
+                snake = _forward_run(seq_a, alo + pos_x, seq_b, blo + pos_y,
+                                     min(len_a - pos_x, len_b - pos_y))
+                pos_x, pos_y = pos_x + snake, pos_y + snake
+                v[k] = pos_x
+                if pos_x >= len_a and pos_y >= len_b:
+                    break
             else:
-                # Not adjacent.  Remember the first block (size1==0 means it's
-                # the dummy we started with), and make the second block the
-                # new block to compare against.
-                if size1:
-                    non_adjacent.append((pos_a1, pos_b1, size1))
-                pos_a1, pos_b1, size1 = pos_a2, pos_b2, size2
-        if size1:
-            non_adjacent.append((pos_a1, pos_b1, size1))
-
-        non_adjacent.append((len_a, len_b, 0))
-        # pylint: disable=attribute-defined-outside-init
-        self.matching_blocks = list(map(Match._make, non_adjacent))
-        return self.matching_blocks
+                trace.append(v.copy())
+                continue
+            break
+
+        # Backward pass: walk the snapshots from (len_a, len_b) back to
+        # the origin, recording the snake that follows every edit.
+        pos_x, pos_y = len_a, len_b
+        for edits in range(len(trace), 0, -1):
+            prev_v = trace[edits - 1]
+            k = pos_x - pos_y
+            if k == -edits or (k != edits and
+                               prev_v[k - 1] < prev_v[k + 1]):
+                prev_k = k + 1
+                mid_x = prev_v[prev_k]
+            else:
+                prev_k = k - 1
+                mid_x = prev_v[prev_k] + 1
+            mid_y = mid_x - k
+            if pos_x > mid_x:
+                matching_blocks.append(Match(alo + mid_x, blo + mid_y,
+                                             pos_x - mid_x))
+            pos_x = prev_v[prev_k]
+            pos_y = pos_x - prev_k
+        if pos_x:
+            matching_blocks.append(Match(alo, blo, pos_x))
+        return matching_blocks
+
+    def _hirschberg_blocks(self,
+                           alo: int,
+                           ahi: int,
+                           blo: int,
+                           bhi: int) -> List[Match]:
+        """Return unsorted matching blocks of a[alo:ahi] and b[blo:bhi]
+        along a shortest edit script, in space linear in the window."""
+
+        matching_blocks: List[Match] = []
+        queue = [(alo, ahi, blo, bhi)]
+        while queue:
+            self.__poll()
+            alo, ahi, blo, bhi = queue.pop()
+            self._work_done += ahi - alo
+            alo, ahi, blo, bhi = self._strip_common(alo, ahi, blo, bhi,
+                                                    matching_blocks)
+            if not (alo < ahi and blo < bhi):
+                continue
+            # the Myers trace has at most D**2 entries, D <= N + M
+            if (ahi - alo + bhi - blo) ** 2 * _TRACE_ENTRY_SIZE <= (
+                    self.memory_budget):
+                matching_blocks.extend(self._myers_blocks(alo, ahi,
+                                                          blo, bhi))
+                continue
+            # both pieces around the middle snake have fewer edits than
+            # the window, so this terminates
+            snake = self._middle_snake(alo, ahi, blo, bhi)
+            if snake is None:
+                # too far apart: settle for greedy matches
+                # pylint: disable=attribute-defined-outside-init
+                self.approximate = True
+                matching_blocks.extend(self.__greedy_blocks(alo, ahi,
+                                                            blo, bhi))
+                continue
+            pos_x, pos_y, end_x, end_y = snake
+            if end_x > pos_x:
+                matching_blocks.append(Match(pos_x, pos_y, end_x - pos_x))
+            queue.append((alo, pos_x, blo, pos_y))
+            queue.append((end_x, ahi, end_y, bhi))
+            self._work_done -= (pos_x - alo) + (ahi - end_x)
+        return matching_blocks
+
+    # pylint: disable=too-many-locals, too-many-branches
+    def _middle_snake(self,
+                      alo: int,
+                      ahi: int,
+                      blo: int,
+                      bhi: int) -> Optional[Tuple[int, int, int, int]]:
+        """Return (x, y, u, v) such that a[x:u] == b[y:v] is the middle
+        snake of a shortest edit script of a[alo:ahi] and b[blo:bhi], or
+        None if that script has more edits than limits allow."""
+
+        seq_a, seq_b = self._a, self._b
+        len_a, len_b = ahi - alo, bhi - blo
+        delta = len_a - len_b
+        odd = delta & 1
+        # forward[k] is the furthest x on diagonal k = x - y reached from
+        # (0, 0); backward[k] likewise, from (len_a, len_b) on the grid
+        # flipped end to end, where diagonal k is forward's delta - k
+        offset = (len_a + len_b + 1) // 2 + 2
+        forward = [0] * (2 * offset + 1)
+        backward = [0] * (2 * offset + 1)
+        max_edits = self.limits.edits if self.limits else None
+        for edits in range((len_a + len_b + 1) // 2 + 1):
+            self.__poll()
+            # a snake found in this round is the middle of a script of
+            # 2 * edits - 1 or 2 * edits edits
+            if max_edits is not None and 2 * edits - 1 > max_edits:
+                return None
+            for k in range(-edits, edits + 1, 2):
+                if k == -edits or (k != edits and
+                                   forward[offset + k - 1] <
+                                   forward[offset + k + 1]):
+                    pos_x = forward[offset + k + 1]
+                else:
+                    pos_x = forward[offset + k - 1] + 1
+                pos_y = pos_x - k
+                start_x, start_y = pos_x, pos_y
+                snake = _forward_run(seq_a, alo + pos_x, seq_b, blo + pos_y,
+                                     min(len_a - pos_x, len_b - pos_y))
+                pos_x, pos_y = pos_x + snake, pos_y + snake
+                forward[offset + k] = pos_x
+                if odd and -edits < delta - k < edits and (
+                        pos_x + backward[offset + delta - k] >= len_a):
+                    return (alo + start_x, blo + start_y,
+                            alo + pos_x, blo + pos_y)
+            for k in range(-edits, edits + 1, 2):
+                if k == -edits or (k != edits and
+                                   backward[offset + k - 1] <
+                                   backward[offset + k + 1]):
+                    pos_x = backward[offset + k + 1]
+                else:
+                    pos_x = backward[offset + k - 1] + 1
+                pos_y = pos_x - k
+                start_x, start_y = pos_x, pos_y
+                snake = _backward_run(seq_a, ahi - pos_x, seq_b, bhi - pos_y,
+                                      min(len_a - pos_x, len_b - pos_y))
+                pos_x, pos_y = pos_x + snake, pos_y + snake
+                backward[offset + k] = pos_x
+                if not odd and -edits <= delta - k <= edits and (
+                        pos_x + forward[offset + delta - k] >= len_a):
+                    return (ahi - pos_x, bhi - pos_y,
+                            ahi - start_x, bhi - start_y)
+        raise AssertionError('no middle snake')  # pragma: no cover
+
+    # pylint: disable=too-many-locals, too-many-statements
+    def _patience_blocks(self,
+                         alo: int,
+                         ahi: int,
+                         blo: int,
+                         bhi: int) -> List[Match]:
+        """Return unsorted matching blocks of a[alo:ahi] and b[blo:bhi]
+        anchored on elements that occur exactly once in each side."""
+
+        assert self.seq_a is not None
+        assert self.seq_b is not None
+        seq_a, seq_b, isbjunk = (
+            self._a, self._b, self.bjunk.__contains__)
+        matching_blocks: List[Match] = []
+        queue = [(alo, ahi, blo, bhi)]
+        while queue:
+            self.__poll()
+            alo, ahi, blo, bhi = queue.pop()
+            self._work_done += ahi - alo
+            alo, ahi, blo, bhi = self._strip_common(alo, ahi, blo, bhi,
+                                                    matching_blocks)
+            if not (alo < ahi and blo < bhi):
+                continue
+
+            # a2i[x] is the index of x in a[alo:ahi], or -1 if x appears
+            # there more than once; b2i likewise, but only for elements
+            # unique in a
+            a2i: Dict[TElem, int] = {}
+            for pos_a in range(alo, ahi):
+                elt = seq_a[pos_a]
+                a2i[elt] = -1 if elt in a2i else pos_a
+            b2i: Dict[TElem, int] = {}
+            for pos_b in range(blo, bhi):
+                elt = seq_b[pos_b]
+                if a2i.get(elt, -1) >= 0:
+                    b2i[elt] = -1 if elt in b2i else pos_b
+            anchors = sorted((a2i[elt], pos_b) for elt, pos_b in b2i.items()
+                             if pos_b >= 0 and not isbjunk(elt))
+            if not anchors:
+                # nothing unique to synch up on -- fall back to the
+                # longest-match search for this window, which counts it
+                self._work_done -= ahi - alo
+                matching_blocks.extend(
+                    self._longest_match_blocks(alo, ahi, blo, bhi))
+                continue
+
+            # patience sorting: the longest run of anchors increasing in
+            # b as well as in a; tails[n] is the smallest b index ending
+            # an increasing run of length n + 1
+            tails: List[int] = []
+            tail_anchors: List[int] = []
+            back = [-1] * len(anchors)
+            for idx, (_, pos_b) in enumerate(anchors):
+                pile = bisect_left(tails, pos_b)
+                if pile:
+                    back[idx] = tail_anchors[pile - 1]
+                if pile == len(tails):
+                    tails.append(pos_b)
+                    tail_anchors.append(idx)
+                else:
+                    tails[pile] = pos_b
+                    tail_anchors[pile] = idx
+            chain = []
+            idx = tail_anchors[-1]
+            while idx >= 0:
+                chain.append(anchors[idx])
+                idx = back[idx]
+            chain.reverse()
+
+            # every anchor grows into the longest equal run around it,
+            # which swallows the anchors next to it on the same diagonal;
+            # the runs are matches, and the gaps between them are new
+            # windows, unless one side of a gap is empty
+            for pos_a, pos_b in chain:
+                if pos_a < alo or pos_b < blo:
+                    continue
+                size = _backward_run(seq_a, pos_a, seq_b, pos_b,
+                                     min(pos_a - alo, pos_b - blo))
+                pos_a, pos_b = pos_a - size, pos_b - size
+                size += _forward_run(seq_a, pos_a + size, seq_b, pos_b + size,
+                                     min(ahi - pos_a, bhi - pos_b) - size)
+                matching_blocks.append(Match(pos_a, pos_b, size))
+                if alo < pos_a and blo < pos_b:
+                    queue.append((alo, pos_a, blo, pos_b))
+                    self._work_done -= pos_a - alo
+                alo, blo = pos_a + size, pos_b + size
+            if alo < ahi and blo < bhi:
+                queue.append((alo, ahi, blo, bhi))
+                self._work_done -= ahi - alo
+        return matching_blocks
 
     def get_opcodes(self) -> List[OpCode]:
         """Return list of 5-tuples describing how to turn a into b.
@@ -723,6 +3024,178 @@ class SequenceMatcher(Generic[TElem]):
                 answer.append((EditOp.Equal, pos_a, end_a, pos_b, end_b))
         return answer
 
+    def iter_opcodes(self) -> Iterator[OpCode]:
+        """Generate the 5-tuples of get_opcodes(), as soon as each is known.
+
+        get_opcodes() can't return anything until all the matching blocks
+        have been found.  Here, with Algorithm.Default, the pieces of a
+        and b left over by find_longest_match() are looked into left to
+        right, and an opcode is generated as soon as all that comes
+        before it is settled, so the first ones come out long before the
+        last ones are known.  The other algorithms find all the matching
+        blocks first.  Once the generator is exhausted, the matching
+        blocks and opcodes are cached as get_opcodes() would cache them.
+
+        >>> s = SequenceMatcher(None, "qabxcd", "abycdf")
+        >>> next(s.iter_opcodes())
+        (Delete, 0, 1, 0, 0)
+        >>> list(s.iter_opcodes()) == s.get_opcodes()
+        True
+        """
+
+        if self.matching_blocks is None:
+            self.__pick_strategy()
+        if (self.matching_blocks is not None or
+                self.algorithm is not Algorithm.Default):
+            yield from self.get_opcodes()
+            return
+        len_a, len_b = len(self.seq_a), len(self.seq_b)
+        self.__start_limits()
+        answer: List[OpCode] = []
+        matching_blocks: List[Match] = []
+        end_a = end_b = 0
+        # pos_a, pos_b, size is the last block found, held back until the
+        # next one shows it's not adjacent to it
+        pos_a = pos_b = size = 0
+        # a stack of windows still to look into, and of the blocks found
+        # between them, the leftmost on top
+        stack: List[Any] = [(0, len_a, 0, len_b)]
+        while stack:
+            item = stack.pop()
+            if not isinstance(item, Match):
+                self.__poll()
+                alo, ahi, blo, bhi = item
+                self._work_done += ahi - alo
+                matched = self.find_longest_match(alo, ahi, blo, bhi)
+                if matched.size:
+                    if matched.a + matched.size < ahi and (
+                            matched.b + matched.size < bhi):
+                        stack.append((matched.a + matched.size, ahi,
+                                      matched.b + matched.size, bhi))
+                        self._work_done -= ahi - matched.a - matched.size
+                    stack.append(matched)
+                    if alo < matched.a and blo < matched.b:
+                        stack.append((alo, matched.a, blo, matched.b))
+                        self._work_done -= matched.a - alo
+                continue
+            if pos_a + size == item.a and pos_b + size == item.b:
+                size += item.size
+                continue
+            if size:
+                matching_blocks.append(Match(pos_a, pos_b, size))
+            for opcode in self.__opcodes_upto(end_a, end_b, pos_a, pos_b,
+                                              size):
+                answer.append(opcode)
+                yield opcode
+            end_a, end_b = pos_a + size, pos_b + size
+            pos_a, pos_b, size = item
+        if size:
+            matching_blocks.append(Match(pos_a, pos_b, size))
+        matching_blocks.append(Match(len_a, len_b, 0))
+        for opcode in self.__opcodes_upto(end_a, end_b, pos_a, pos_b, size):
+            answer.append(opcode)
+            yield opcode
+        end_a, end_b = pos_a + size, pos_b + size
+        for opcode in self.__opcodes_upto(end_a, end_b, len_a, len_b, 0):
+            answer.append(opcode)
+            yield opcode
+        # pylint: disable=attribute-defined-outside-init
+        self.matching_blocks = matching_blocks
+        self.opcodes = answer
+        if self.progress is not None:
+            self.progress(len_a, len_a)
+
+    # pylint: disable=too-many-branches
+    def __pick_strategy(self) -> None:
+        # With Algorithm.Auto, pick the algorithm and kernel for a and b
+        # once, and record them (and intern, picked by set_seq2()) in
+        # strategy.
+        if not self.auto or self.strategy is not None:
+            return
+        len_a, len_b = len(self._a), len(self._b)
+        sample = _sample(self._b)
+        counts = Counter(sample)
+        ntest = len(sample) // 100 + 1
+        if len_a * len_b <= _AUTO_SMALL:
+            # cheap whatever the engine: keep the one of difflib
+            algorithm, kernel, reason = (
+                Algorithm.Default, Kernel.Dict, 'small sequences')
+        elif self.isjunk is None and self.__edits_at_most(2 * _AUTO_EDITS):
+            # O(ND) with a small D; Myers ignores junk, hence isjunk
+            algorithm, kernel, reason = (
+                Algorithm.Myers, Kernel.Dict,
+                'few edits (at most %d substitutions)' % _AUTO_EDITS)
+        elif len(counts) * 2 >= len(sample):
+            algorithm, kernel, reason = (
+                Algorithm.Patience, Kernel.Dict, 'mostly unique elements')
+        elif sum(count for count in counts.values() if count > ntest) * 2 >= (
+                len(sample)) and not (self.autojunk and len_b >= 200):
+            # popular elements autojunk won't purge: the dict loop would
+            # be O(n*m)
+            algorithm, kernel, reason = (
+                Algorithm.Default, Kernel.Suffix, 'repetitive elements')
+        elif _np is not None and _int_coded(self._a) and (
+                _int_coded(self._b)):
+            algorithm, kernel, reason = (
+                Algorithm.Default, Kernel.NumPy, 'integer elements')
+        else:
+            algorithm, kernel, reason = (
+                Algorithm.Default, Kernel.Dict, 'many edits')
+        self.algorithm, self.kernel = algorithm, kernel
+        self.strategy = Strategy(algorithm, kernel, self.intern, reason)
+
+    def __edits_at_most(self, max_edits: int) -> bool:
+        # Whether at most max_edits insertions and deletions turn a into
+        # b: the forward pass of _myers_blocks(), stopped after max_edits
+        # rounds.
+        seq_a, seq_b = self._a, self._b
+        len_a, len_b = len(seq_a), len(seq_b)
+        if abs(len_a - len_b) > max_edits:
+            return False
+        furthest: Dict[int, int] = {1: 0}
+        for edits in range(max_edits + 1):
+            for k in range(-edits, edits + 1, 2):
+                if k == -edits or (k != edits and
+                                   furthest[k - 1] < furthest[k + 1]):
+                    pos_x = furthest[k + 1]
+                else:
+                    pos_x = furthest[k - 1] + 1
+                pos_y = pos_x - k
+                pos_x += _forward_run(seq_a, pos_x, seq_b, pos_y,
+                                      min(len_a - pos_x, len_b - pos_y))
+                furthest[k] = pos_x
+                if pos_x >= len_a and pos_x - k >= len_b:
+                    return True
+        return False
+
+    def __start_limits(self) -> None:
+        # Fill up the probe budget, and clear the progress, for computing
+        # one set of blocks.
+        # pylint: disable=attribute-defined-outside-init
+        self.approximate = False
+        self._probes_left = self.limits.probes if self.limits else None
+        self._work_done = 0
+
+    @staticmethod
+    def __opcodes_upto(end_a: int, end_b: int,
+                       pos_a: int, pos_b: int, size: int) -> List[OpCode]:
+        # The opcodes from (end_a, end_b) through the block pos_a, pos_b,
+        # size, as in get_opcodes().
+        opcodes: List[OpCode] = []
+        tag: EditOp = EditOp.Equal
+        if end_a < pos_a and end_b < pos_b:
+            tag = EditOp.Replace
+        elif end_a < pos_a:
+            tag = EditOp.Delete
+        elif end_b < pos_b:
+            tag = EditOp.Insert
+        if tag:
+            opcodes.append((tag, end_a, pos_a, end_b, pos_b))
+        if size:
+            opcodes.append((EditOp.Equal, pos_a, pos_a + size,
+                            pos_b, pos_b + size))
+        return opcodes
+
     def get_grouped_opcodes(self, size: int = 3) -> Iterable[List[OpCode]]:
         """ Isolate change clusters by eliminating ranges with no changes.
 
@@ -750,28 +3223,9 @@ class SequenceMatcher(Generic[TElem]):
           ('equal', 35, 38, 31, 34)]]
         """
 
-        codes = self.get_opcodes()
-        if not codes:
-            codes = [(EditOp.Equal, 0, 1, 0, 1)]
-        # Fixup leading and trailing groups if they show no changes.
-        if codes[0][0] == EditOp.Equal:
-            tag, pos_a, end_a, pos_b, end_b = codes[0]
-            codes[0] = (tag,
-                        max(pos_a, end_a - size),
-                        end_a,
-                        max(pos_b, end_b - size),
-                        end_b)
-        if codes[-1][0] == EditOp.Equal:
-            tag, pos_a, end_a, pos_b, end_b = codes[-1]
-            codes[-1] = (tag,
-                         pos_a,
-                         min(end_a, pos_a + size),
-                         pos_b,
-                         min(end_b, pos_b + size))
-
         double_size = size + size
         group: List[OpCode] = []
-        for tag, pos_a, end_a, pos_b, end_b in codes:
+        for tag, pos_a, end_a, pos_b, end_b in self.__trimmed_opcodes(size):
             # End the current group and start a new one whenever
             # there is a large range with no changes.
             if tag == EditOp.Equal and end_a - pos_a > double_size:
@@ -788,6 +3242,32 @@ class SequenceMatcher(Generic[TElem]):
         if group and not (len(group) == 1 and group[0][0] == EditOp.Equal):
             yield group
 
+    def __trimmed_opcodes(self, size: int) -> Iterator[OpCode]:
+        # iter_opcodes(), with leading and trailing groups cut down to
+        # size if they show no changes; the last opcode is held back
+        # until it's known to be the last.
+        codes = self.iter_opcodes()
+        last = next(codes, (EditOp.Equal, 0, 1, 0, 1))
+        # Fixup leading and trailing groups if they show no changes.
+        if last[0] == EditOp.Equal:
+            tag, pos_a, end_a, pos_b, end_b = last
+            last = (tag,
+                    max(pos_a, end_a - size),
+                    end_a,
+                    max(pos_b, end_b - size),
+                    end_b)
+        for code in codes:
+            yield last
+            last = code
+        if last[0] == EditOp.Equal:
+            tag, pos_a, end_a, pos_b, end_b = last
+            last = (tag,
+                    pos_a,
+                    min(end_a, pos_a + size),
+                    pos_b,
+                    min(end_b, pos_b + size))
+        yield last
+
     def ratio(self) -> float:
         """Return a measure of the sequences' similarity (float in [0,1]).
 
@@ -815,6 +3295,52 @@ class SequenceMatcher(Generic[TElem]):
         matches = sum(triple[-1] for triple in self.get_matching_blocks())
         return _calculate_ratio(matches, len(self.seq_a) + len(self.seq_b))
 
+    def ratio_at_least(self, threshold: float) -> float:
+        """Return ratio() if it is at least threshold, else an upper bound
+        on ratio() that is less than threshold.
+
+        ratio() needs all the matching blocks.  Here, with
+        Algorithm.Default, the search for them is given up as soon as
+        the blocks found so far and the pieces of a and b left to look
+        into can't add up to threshold any more, which is much cheaper
+        for a poor match; the matching blocks are only cached if the
+        search ran to the end.
+
+        >>> s = SequenceMatcher(None, "abcd", "bcde")
+        >>> s.ratio_at_least(0.7)
+        0.75
+        >>> s.ratio_at_least(0.8) < 0.8
+        True
+        """
+
+        assert self.seq_a is not None
+        assert self.seq_b is not None
+        len_a, len_b = len(self.seq_a), len(self.seq_b)
+        bound = self.real_quick_ratio()
+        if bound < threshold:
+            return bound
+        if self.matching_blocks is None:
+            self.__pick_strategy()
+        if (self.matching_blocks is not None or
+                self.algorithm is not Algorithm.Default):
+            return self.ratio()
+        # need is the fewest matches scoring at least threshold
+        total = len_a + len_b
+        need = max(0, int(threshold * total / 2))
+        while need and _calculate_ratio(need - 1, total) >= threshold:
+            need -= 1
+        while _calculate_ratio(need, total) < threshold:
+            need += 1
+        self.__start_limits()
+        matching_blocks = self.__bounded_blocks(0, len_a, 0, len_b, need)
+        if matching_blocks is None:
+            return _calculate_ratio(need - 1, total)
+        # pylint: disable=attribute-defined-outside-init
+        self.matching_blocks = _collapsed(matching_blocks, len_a, len_b)
+        if self.progress is not None:
+            self.progress(len_a, len_a)
+        return self.ratio()
+
     def quick_ratio(self) -> float:
         """Return an upper bound on ratio() relatively quickly.
 
@@ -825,20 +3351,13 @@ class SequenceMatcher(Generic[TElem]):
         # viewing a and b as multisets, set matches to the cardinality
         # of their intersection; this counts the number of matches
         # without regard to order, so is clearly an upper bound
-        if self.fullbcount is None:
-            # pylint: disable=attribute-defined-outside-init
-            fullbcount: Dict[TElem, int] = {}
-            self.fullbcount = fullbcount
-            assert self.seq_b is not None
-            for elt in self.seq_b:
-                fullbcount[elt] = fullbcount.get(elt, 0) + 1
-        fullbcount = self.fullbcount
+        fullbcount = self.bindex.fullbcount
         # avail[x] is the number of times x appears in 'b' less the
         # number of times we've seen it in 'a' so far ... kinda
         avail: Dict[TElem, int] = {}
         availhas, matches = avail.__contains__, 0
         assert self.seq_a is not None
-        for elt in self.seq_a:
+        for elt in self._a:
             if availhas(elt):
                 numb = avail[elt]
             else:
@@ -849,6 +3368,39 @@ class SequenceMatcher(Generic[TElem]):
         assert self.seq_b is not None
         return _calculate_ratio(matches, len(self.seq_a) + len(self.seq_b))
 
+    def lcs_ratio(self) -> float:
+        """Return a measure of the sequences' similarity based on the
+        length of their longest common subsequence.
+
+        Where T is the total number of elements in both sequences, and
+        L is the length of a longest common subsequence, this is 2.0*L / T.
+        Junk plays no part in it.  The matching blocks are a common
+        subsequence, so this is an upper bound on .ratio() too.
+
+        It's computed bit-parallel, after Allison-Dix and Hyyro: one row
+        of the LCS table is kept as the bits of an int, and every element
+        of a costs a few big-int operations.  That's fast for short
+        sequences such as words or lines.
+
+        >>> s = SequenceMatcher(None, "abcd", "bcde")
+        >>> s.lcs_ratio()
+        0.75
+        >>> SequenceMatcher(None, "abxcd", "abcyd").lcs_ratio()
+        0.8
+        """
+
+        assert self.seq_a is not None
+        assert self.seq_b is not None
+        bmasksget = self.bindex.bmasks.get
+        # a zero bit j of row means the LCS of a[:i] and b[:j+1] is longer
+        # than that of a[:i] and b[:j]
+        full = row = (1 << len(self._b)) - 1
+        for elt in self._a:
+            matches = row & bmasksget(elt, 0)
+            row = ((row + matches) | (row - matches)) & full
+        lcs = len(self._b) - bin(row).count('1')
+        return _calculate_ratio(lcs, len(self.seq_a) + len(self.seq_b))
+
     def real_quick_ratio(self) -> float:
         """Return an upper bound on ratio() very quickly.
 
@@ -870,7 +3422,9 @@ class Util(Generic[TElem]):
     def get_close_matches(word: Sequence[TElem],
                           possibilities: List[Sequence[TElem]],
                           max_size: int = 3,
-                          cutoff: float = 0.6) -> List[Sequence[TElem]]:
+                          cutoff: float = 0.6,
+                          cache: Optional[BIndexCache] = None
+                          ) -> List[Sequence[TElem]]:
         """Use SequenceMatcher to return list of the best "good enough" matches.
 
         word is a sequence for which close matches are desired (typically a
@@ -885,6 +3439,9 @@ class Util(Generic[TElem]):
         Optional arg cutoff (default 0.6) is a float in [0, 1].  Possibilities
         that don't score at least that similar to word are ignored.
 
+        Optional arg cache is a BIndexCache to take the index of word from;
+        see SequenceMatcher.__init__.
+
         The best (no more than max_size) matches among the possibilities are
         returned in a list, sorted by similarity score, most similar first.
 
@@ -904,14 +3461,16 @@ class Util(Generic[TElem]):
         if not 0.0 <= cutoff <= 1.0:
             raise ValueError("cutoff must be in [0.0, 1.0]: %r" % (cutoff,))
         result: List[Tuple[float, Sequence[TElem]]] = []
-        seq_matcher = SequenceMatcher[TElem]()
+        seq_matcher = SequenceMatcher[TElem](cache=cache)
         seq_matcher.set_seq2(word)
         for possibility in possibilities:
             seq_matcher.set_seq1(possibility)
             if seq_matcher.real_quick_ratio() >= cutoff and \
                seq_matcher.quick_ratio() >= cutoff and \
-               seq_matcher.ratio() >= cutoff:
-                result.append((seq_matcher.ratio(), possibility))
+               seq_matcher.lcs_ratio() >= cutoff:
+                score = seq_matcher.ratio_at_least(cutoff)
+                if score >= cutoff:
+                    result.append((score, possibility))
 
         # Move the best scorers to head of list
         result = _nlargest(max_size, result)
@@ -1035,20 +3594,33 @@ class Differ(Generic[TElem]):  # pylint: disable=too-few-public-methods
 
     Methods:
 
-    __init__(linejunk=None, charjunk=None)
+    __init__(linejunk=None, charjunk=None, algorithm=Algorithm.Default,
+             cache=None, limits=None, cancel=None, progress=None,
+             lsh=None, executor=None)
         Construct a text differencer, with optional filters.
 
     compare(a, b)
         Compare two sequences of lines; generate the resulting delta.
+
+    compare_stream(a, b, window=4096)
+        Compare two iterables of lines in bounded memory; generate the
+        resulting delta.
     """
 
-    def __init__(self,
+    def __init__(self,  # pylint: disable=too-many-arguments
                  linejunk: Optional[Callable[[TElem], bool]] = None,
-                 charjunk: Optional[Callable[[TElem], bool]] = None):
+                 charjunk: Optional[Callable[[TElem], bool]] = None,
+                 algorithm: TAlgo = Algorithm.Default,
+                 cache: Optional[BIndexCache] = None,
+                 limits: Optional[CostLimits] = None,
+                 cancel: Optional[CancelToken] = None,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 lsh: Optional[MinHashLSH] = None,
+                 executor: Optional[Executor] = None):
         """
         Construct a text differencer, with optional filters.
 
-        The two optional keyword parameters are for filter functions:
+        The first two optional keyword parameters are for filter functions:
 
         - `linejunk`: A function that should accept a single string argument,
           and return true iff the string is junk. The module-level function
@@ -1062,10 +3634,60 @@ class Differ(Generic[TElem]):  # pylint: disable=too-few-public-methods
           module-level function `is_character_junk` may be used to filter out
           whitespace characters (a blank or tab; **note**: bad idea to include
           newline in this!).  Use of is_character_junk is recommended.
+
+        - `algorithm`: The Algorithm the line-level SequenceMatcher uses
+          to find matching blocks.  See SequenceMatcher.__init__.
+
+        - `cache`: A BIndexCache the line-level SequenceMatcher takes the
+          index of the second sequence from.  See SequenceMatcher.__init__.
+
+        - `limits`: A CostLimits capping the work of each compare().  When
+          a cap is hit, a cheaper way is taken, and `approximate` is set to
+          True once the delta has been generated.
+
+        - `cancel`: A CancelToken; generating the delta raises DiffCancelled
+          soon after it is cancelled.
+
+        - `progress`: A function called as progress(done, total) while the
+          delta is generated, where the delta of done of the total lines
+          of both sequences has been generated.  compare_stream() can only
+          count the lines read so far in total.
+
+        - `lsh`: A MinHashLSH to score only the likely close pairs of lines
+          of big replace blocks with, instead of all of them; a close pair
+          may then be missed, so `approximate` is set to True whenever it
+          is used.  None (the default) scores all pairs.
+
+        - `executor`: A concurrent.futures.Executor, best a
+          ProcessPoolExecutor, to work out the intraline matching of the
+          bigger replace blocks on while the delta before them is
+          generated; the delta is the same, and comes out in order.
+          charjunk must be picklable then, cancel can only stop the
+          blocks the executor hasn't started yet, and nothing is handed
+          over under a pair_ratios limit.
+
+        >>> from concurrent.futures import ThreadPoolExecutor
+        >>> a = ['line %d of a' % i for i in range(20)]
+        >>> b = ['line %d of b' % i for i in range(20)]
+        >>> with ThreadPoolExecutor() as pool:
+        ...     delta = list(Differ(executor=pool).compare(a, b))
+        >>> [result.to_dict() for result in delta] == [
+        ...     result.to_dict() for result in Differ().compare(a, b)]
+        True
         """
 
         self.linejunk = linejunk
         self.charjunk = charjunk
+        self.algorithm = Algorithm(algorithm)
+        self.cache = cache
+        self.limits = limits
+        self.approximate = False
+        self._pairs_left: Optional[int] = None
+        self.cancel = cancel
+        self.progress = progress
+        self._work_done = self._work_total = 0
+        self.lsh = lsh
+        self.executor = executor
 
     def compare(self,
                 seq_a: Sequence[TElem],
@@ -1096,20 +3718,207 @@ class Differ(Generic[TElem]):  # pylint: disable=too-few-public-methods
         + emu
         """
 
-        cruncher = SequenceMatcher(self.linejunk, seq_a, seq_b)
-        for tag, alo, ahi, blo, bhi in cruncher.get_opcodes():
-            if tag == EditOp.Replace:
-                result = self._fancy_replace(seq_a, alo, ahi, seq_b, blo, bhi)
-            elif tag == EditOp.Delete:
-                result = self._dump(tag, seq_a, alo, ahi)
-            elif tag == EditOp.Insert:
-                result = self._dump(tag, seq_b, blo, bhi)
-            elif tag == EditOp.Equal:
-                result = self._dump(tag, seq_a, alo, ahi, seq_b, blo, bhi)
+        self.__start_limits()
+        self._work_total = len(seq_a) + len(seq_b)
+        cruncher = SequenceMatcher(self.linejunk, seq_a, seq_b,
+                                   algorithm=self.algorithm,
+                                   cache=self.cache, limits=self.limits,
+                                   cancel=self.cancel)
+        yield from self._delta(cruncher.iter_opcodes(), seq_a, seq_b)
+        self.approximate = self.approximate or cruncher.approximate
+
+    def __start_limits(self) -> None:
+        # Fill up the pair budget, and clear the progress, for one
+        # comparison.
+        self.approximate = False
+        self._pairs_left = self.limits.pair_ratios if self.limits else None
+        self._work_done = 0
+
+    def __poll(self) -> None:
+        # Between two pieces of work: stop if cancelled, and report how
+        # far generating the delta got.
+        if self.cancel is not None:
+            self.cancel.check()
+        if self.progress is not None:
+            self.progress(self._work_done, self._work_total)
+
+    def compare_stream(self,  # pylint: disable=too-many-locals
+                       iter_a: Iterable[TElem],
+                       iter_b: Iterable[TElem],
+                       window: int = _STREAM_WINDOW) -> Iterable[TReslt]:
+        r"""
+        Compare two iterables of lines; generate the resulting delta.
+
+        Like compare(), but a and b can be iterators of any length: at
+        most `window` lines of each are held at a time.  The lines held
+        are compared, and the delta up to the last block of equal lines
+        that ends before the end of both windows is generated at once,
+        those lines dropped, and the windows filled up again; so the
+        comparison synchs up again on every such block.  A block of
+        equal lines that runs up to the end of a window is settled but
+        for its last line, which is left to synch up on.  If the windows
+        are full and have no block of equal lines at all, the first
+        halves of them are taken to be settled, and compared on their
+        own.
+
+        The delta is the same as compare()'s as long as the blocks of
+        equal lines compare() would find lie within a window of each
+        other, and a valid one otherwise.
+
+        >>> list(Differ().compare_stream(iter('abcd'), iter('axcd'),
+        ...                              window=2))
+        [[Equal]a,a, [Delete]b, [Insert]x, [Equal]c,c, [Equal]d,d]
+
+        Identical streams are settled a window, less a line, at a time,
+        one comparison per window; progress is told a new total every
+        time the windows are filled up:
+
+        >>> totals = set()
+        >>> differ = Differ(progress=lambda done, total: totals.add(total))
+        >>> lines = ['%d\n' % i for i in range(100)]
+        >>> delta = list(differ.compare_stream(iter(lines), iter(lines),
+        ...                                    window=10))
+        >>> len(delta), len(totals), differ.approximate
+        (100, 11, False)
+        """
+
+        if window < 2:
+            raise ValueError("window must be >= 2: %r" % (window,))
+        iter_a, iter_b = iter(iter_a), iter(iter_b)
+        seq_a: List[TElem] = []
+        seq_b: List[TElem] = []
+        done_a = done_b = False
+        self.__start_limits()
+        while True:
+            if not done_a:
+                seq_a.extend(islice(iter_a, window - len(seq_a)))
+                done_a = len(seq_a) < window
+            if not done_b:
+                seq_b.extend(islice(iter_b, window - len(seq_b)))
+                done_b = len(seq_b) < window
+            if not (seq_a or seq_b):
+                return
+            self._work_total = self._work_done + len(seq_a) + len(seq_b)
+            cruncher = SequenceMatcher(self.linejunk, seq_a, seq_b,
+                                       algorithm=self.algorithm,
+                                       limits=self.limits,
+                                       cancel=self.cancel)
+            opcodes = cruncher.get_opcodes()
+            self.approximate = self.approximate or cruncher.approximate
+            if done_a and done_b:
+                yield from self._delta(opcodes, seq_a, seq_b)
+                return
+            settled: Optional[List[OpCode]] = None
+            for idx, (tag, alo, ahi, blo, bhi) in enumerate(opcodes):
+                if tag != EditOp.Equal:
+                    continue
+                if (ahi < len(seq_a) or done_a) and (
+                        bhi < len(seq_b) or done_b):
+                    settled = opcodes[:idx + 1]
+                elif ahi - alo > 1:
+                    # runs up to the end of a window: keep its last line
+                    # back to synch up on
+                    settled = opcodes[:idx] + [
+                        (tag, alo, ahi - 1, blo, bhi - 1)]
+            if settled:
+                opcodes = settled
+                used_a, used_b = opcodes[-1][2], opcodes[-1][4]
             else:
-                raise ValueError('unknown tag %r' % (tag,))
+                # nothing to synch up on: give up on the first halves
+                used_a = min(len(seq_a), window // 2)
+                used_b = min(len(seq_b), window // 2)
+                opcodes = SequenceMatcher(
+                    self.linejunk, seq_a[:used_a], seq_b[:used_b],
+                    algorithm=self.algorithm, limits=self.limits,
+                    cancel=self.cancel).get_opcodes()
+                self.approximate = True
+            yield from self._delta(opcodes, seq_a, seq_b)
+            del seq_a[:used_a]
+            del seq_b[:used_b]
+
+    def _delta(self,
+               opcodes: Iterable[OpCode],
+               seq_a: Sequence[TElem],
+               seq_b: Sequence[TElem]) -> Iterable[TReslt]:
+        """Generate the delta of seq_a and seq_b that opcodes describe."""
+        if self.executor is not None:
+            yield from self._parallel_delta(opcodes, seq_a, seq_b)
+        else:
+            for opcode in opcodes:
+                yield from self.__opcode_delta(seq_a, seq_b, opcode)
+        if self.progress is not None:
+            self.progress(self._work_done, self._work_total)
 
-            yield from result
+    def __opcode_delta(self,
+                       seq_a: Sequence[TElem],
+                       seq_b: Sequence[TElem],
+                       opcode: OpCode,
+                       future: Optional[Future] = None) -> Iterable[TReslt]:
+        # Generate the delta of one opcode; that of a replace block comes
+        # from future if it was handed to the executor.
+        tag, alo, ahi, blo, bhi = opcode
+        self.__poll()
+        result: Iterable[TReslt]
+        if future is not None:
+            result, approximate = future.result()
+            self.approximate = self.approximate or approximate
+        elif tag == EditOp.Replace:
+            result = self._fancy_replace(seq_a, alo, ahi, seq_b, blo, bhi)
+        elif tag == EditOp.Delete:
+            result = self._dump(tag, seq_a, alo, ahi)
+        elif tag == EditOp.Insert:
+            result = self._dump(tag, seq_b, blo, bhi)
+        elif tag == EditOp.Equal:
+            result = self._dump(tag, seq_a, alo, ahi, seq_b, blo, bhi)
+        else:
+            raise ValueError('unknown tag %r' % (tag,))
+
+        yield from result
+        self._work_done += (ahi - alo) + (bhi - blo)
+
+    def _parallel_delta(self,
+                        opcodes: Iterable[OpCode],
+                        seq_a: Sequence[TElem],
+                        seq_b: Sequence[TElem]) -> Iterable[TReslt]:
+        """Generate the delta of seq_a and seq_b that opcodes describe,
+        handing every replace block of at least _PARALLEL_MIN_PAIRS pairs
+        of lines to the executor as soon as its opcode comes."""
+
+        # the opcodes whose delta isn't generated yet, in order, each with
+        # the future of its delta if it was handed over
+        pending: Deque[Tuple[OpCode, Optional[Future]]] = deque()
+        try:
+            for opcode in opcodes:
+                pending.append((opcode, self.__hand_over(seq_a, seq_b,
+                                                         opcode)))
+                while pending and (pending[0][1] is None or
+                                   pending[0][1].done()):
+                    yield from self.__opcode_delta(seq_a, seq_b,
+                                                   *pending.popleft())
+            while pending:
+                yield from self.__opcode_delta(seq_a, seq_b,
+                                               *pending.popleft())
+        finally:
+            # stopped early: don't start what no one will look at
+            for _, future in pending:
+                if future is not None:
+                    future.cancel()
+
+    def __hand_over(self,
+                    seq_a: Sequence[TElem],
+                    seq_b: Sequence[TElem],
+                    opcode: OpCode) -> Optional[Future]:
+        # Submit the replace block of opcode to the executor if it's big
+        # enough; return its future, or None.  Not under a pair_ratios
+        # limit, which has to be spent on the blocks in order.
+        assert self.executor is not None
+        tag, alo, ahi, blo, bhi = opcode
+        if (tag != EditOp.Replace or self._pairs_left is not None or
+                (ahi - alo) * (bhi - blo) < _PARALLEL_MIN_PAIRS):
+            return None
+        return self.executor.submit(_replace_block, self.charjunk, self.lsh,
+                                    list(seq_a[alo:ahi]),
+                                    list(seq_b[blo:bhi]))
 
     @staticmethod
     def _dump(tag: EditOp,  # pylint: disable=too-many-arguments
@@ -1175,106 +3984,174 @@ class Differ(Generic[TElem]):  # pylint: disable=too-few-public-methods
         ?    ^  ^  ^
         """
 
-        # don't synch up unless the lines have a similarity score of at
-        # least cutoff; best_ratio tracks the best score seen so far
-        best_ratio, cutoff = 0.74, 0.75
-        cruncher = SequenceMatcher(self.charjunk)
-        eqi, eqj = None, None   # 1st indices of equal lines (if any)
-
-        # search for the pair that matches best without being identical
-        # (identical lines must be junk lines, & we don't want to synch up
-        # on junk -- unless we have to)
-        for pos_b in range(blo, bhi):
-            elem_b = seq_b[pos_b]
-            cruncher.set_seq2(Util[TElem].lift(elem_b))
-            for pos_a in range(alo, ahi):
-                elem_a = seq_a[pos_a]
-                if elem_a == elem_b:
-                    if eqi is None:
-                        eqi, eqj = pos_a, pos_b
-                    continue
-                cruncher.set_seq1(Util[TElem].lift(elem_a))
-                # computing similarity is expensive, so use the quick
-                # upper bounds first -- have seen this speed up messy
-                # compares by a factor of 3.
-                # note that ratio() is only expensive to compute the first
-                # time it's called on a sequence pair; the expensive part
-                # of the computation is cached by cruncher
-                if cruncher.real_quick_ratio() > best_ratio and \
-                   cruncher.quick_ratio() > best_ratio and \
-                   cruncher.ratio() > best_ratio:
-                    best_ratio, best_i, best_j = cruncher.ratio(), pos_a, pos_b
-        if best_ratio < cutoff:
-            # no non-identical "pretty close" pair
-            if eqi is None:
-                # no identical pair either -- treat it as a straight replace
+        budget = self._pairs_left
+        if budget is not None:
+            if budget < (ahi - alo) * (bhi - blo):
+                # scoring every pair would go over the limit
+                self.approximate = True
                 yield from self._plain_replace(seq_a, alo, ahi,
                                                seq_b, blo, bhi)
                 return
-            # no close pair, but an identical pair -- synch up on that
-            assert eqi is not None
-            assert eqj is not None
-            best_i, best_j, best_ratio = eqi, eqj, 1.0
-        else:
-            # there's a close pair, so forget the identical pair (if any)
-            eqi = None
-
-        # seq_a[best_i] very similar to seq_b[best_j]; eqi is None iff they're
-        # not identical
-
-        # pump out diffs from before the synch point
-        yield from self._fancy_helper(seq_a, alo, best_i, seq_b, blo, best_j)
-
-        # do intraline marking on the synch pair
-        aelt, belt = seq_a[best_i], seq_b[best_j]
-        if eqi is None:
-            # # pump out seq_a '-', '?', '+', '?' quad for the synched lines
-            # atags = btags = ""
-            # cruncher.set_seqs(Util[TElem].lift(aelt), Util[TElem].lift(belt))
-            # for tag, ai1, ai2, bj1, bj2 in cruncher.get_opcodes():
-            #    len_a, len_b = ai2 - ai1, bj2 - bj1
-            #    if tag == 'replace':
-            #        atags += '^' * len_a
-            #        btags += '^' * len_b
-            #    elif tag == 'delete':
-            #        atags += '-' * len_a
-            #    elif tag == 'insert':
-            #        btags += '+' * len_b
-            #    elif tag == 'equal':
-            #        atags += ' ' * len_a
-            #        btags += ' ' * len_b
-            #    else:
-            #        raise ValueError('unknown tag %r' % (tag,))
-            # yield from self._qformat(Util[TElem].lift(aelt),
-            #                         Util[TElem].lift(belt),
-            #                         atags, btags)
-            yield Result(EditOp.Delete, aelt)
-            yield Result(EditOp.Insert, belt)
-        else:
-            # the synch pair is identical
-            yield Result(EditOp.Equal, aelt, belt)
+            self._pairs_left = budget - (ahi - alo) * (bhi - blo)
 
-        # pump out diffs from after the synch point
-        yield from self._fancy_helper(seq_a, best_i + 1, ahi,
-                                      seq_b, best_j + 1, bhi)
+        # every pair is scored once, here; the synch points within the
+        # pieces before and after the best pair are then picked among the
+        # same scores
+        pairs = self._score_pairs(seq_a, alo, ahi, seq_b, blo, bhi)
+        yield from self._fancy_synch(seq_a, alo, ahi, seq_b, blo, bhi, pairs)
 
-    def _fancy_helper(self,  # pylint: disable=too-many-arguments
-                      seq_a: Sequence[TElem],
-                      alo: int,
-                      ahi: int,
-                      seq_b: Sequence[TElem],
-                      blo: int,
-                      bhi: int) -> Iterable[TReslt]:
-        results: Iterable[TReslt] = []
-        if alo < ahi:
-            if blo < bhi:
-                results = self._fancy_replace(seq_a, alo, ahi, seq_b, blo, bhi)
-            else:
-                results = self._dump(EditOp.Delete, seq_a, alo, ahi)
-        elif blo < bhi:
-            results = self._dump(EditOp.Insert, seq_b, blo, bhi)
+    def _score_pairs(self,
+                     seq_a: Sequence[TElem],
+                     alo: int,
+                     ahi: int,
+                     seq_b: Sequence[TElem],
+                     blo: int,
+                     bhi: int) -> Tuple[array, array, array]:
+        """Return the close and the identical pairs of lines of a[alo:ahi]
+        and b[blo:bhi].
+
+        Every pair is a cell (j - blo) * (ahi - alo) + (i - alo).  The
+        non-identical pairs scoring at least the cutoff come as their
+        ratios and their cells, the identical pairs as their cells; both
+        list the pairs in the order of j, then i.  Arrays keep them at 8
+        bytes a number, not a tuple apiece.
+        """
+
+        # don't synch up unless the lines have a similarity score of at
+        # least cutoff
+        cutoff = 0.75
+        cruncher = SequenceMatcher(self.charjunk)
+        width = ahi - alo
+        scores = array('d')
+        close = array('q')
+        same = array('q')
+        lines_a = [Util[TElem].lift(seq_a[pos_a]) for pos_a in range(alo, ahi)]
+        lines_b = [Util[TElem].lift(seq_b[pos_b]) for pos_b in range(blo, bhi)]
+        # identical lines are kept apart from the close ones: they must be
+        # junk lines, & we don't want to synch up on junk -- unless we
+        # have to
+        where_a: Dict[TElem, List[int]] = {}
+        for col in range(width):
+            where_a.setdefault(seq_a[alo + col], []).append(col)
+
+        # computing similarity is expensive, so use the quick upper bounds
+        # first -- have seen this speed up messy compares by a factor of
+        # 3.  The quick_ratio() bounds of all the pairs come from counts
+        # of the lines' elements taken once.
+        if self.lsh is not None and (ahi - alo) * (bhi - blo) >= (
+                self.lsh.min_pairs):
+            self.approximate = True
+            candidates = _lsh_candidates(lines_a, lines_b, cutoff, self.lsh)
+        else:
+            candidates = _quick_candidates(lines_a, lines_b, cutoff)
+        for row, cols in enumerate(candidates):
+            self.__poll()
+            elem_b = seq_b[blo + row]
+            same.extend(row * width + col for col in where_a.get(elem_b, ()))
+            cruncher.set_seq2(lines_b[row])
+            for col in cols:
+                if seq_a[alo + col] == elem_b:
+                    continue
+                cruncher.set_seq1(lines_a[col])
+                # ratio_at_least() gives up on a pair as soon as it can't
+                # reach cutoff any more
+                if cruncher.lcs_ratio() >= cutoff:
+                    score = cruncher.ratio_at_least(cutoff)
+                    if score >= cutoff:
+                        scores.append(score)
+                        close.append(row * width + col)
+        return scores, close, same
 
-        yield from results
+    # pylint: disable=too-many-arguments
+    def _fancy_synch(self,
+                     seq_a: Sequence[TElem],
+                     alo: int,
+                     ahi: int,
+                     seq_b: Sequence[TElem],
+                     blo: int,
+                     bhi: int,
+                     pairs: Tuple[array, array, array]) -> Iterable[TReslt]:
+        """Generate the delta of a[alo:ahi] and b[blo:bhi], synching up on
+        the best of the pairs of _score_pairs() within them."""
+
+        # The synch points picked so far split the block into windows:
+        # each one lies after and before its neighbours in both a and b.
+        # Taking the pairs best first, a pair inside a window is the best
+        # pair of that window -- any better one was outside it already,
+        # and windows only shrink -- so it's the window's synch point, and
+        # splits it in two.  Identical pairs are only taken for windows
+        # left without a close pair, in the order of j, then i.  One
+        # bisect a pair, then, and no list of pairs copied per window.
+        scores, close, same = pairs
+        width = ahi - alo
+        synch_i: List[int] = []
+        synch_j: List[int] = []
+        identical: Set[int] = set()
+        # sort is stable, so ties stay in the order of j, then i
+        order = sorted(range(len(scores)), key=scores.__getitem__,
+                       reverse=True)
+        for cells, is_same in ((map(close.__getitem__, order), False),
+                               (same, True)):
+            for cell in cells:
+                row, col = divmod(cell, width)
+                best_i, best_j = alo + col, blo + row
+                where = bisect_left(synch_i, best_i)
+                if where < len(synch_i) and (synch_i[where] <= best_i or
+                                             synch_j[where] <= best_j):
+                    continue
+                if where and synch_j[where - 1] >= best_j:
+                    continue
+                synch_i.insert(where, best_i)
+                synch_j.insert(where, best_j)
+                if is_same:
+                    identical.add(best_i)
+        del order
+
+        for best_i, best_j in zip(synch_i + [ahi], synch_j + [bhi]):
+            # the window before the synch point has no pair to synch on
+            if alo >= best_i:
+                if blo < best_j:
+                    yield from self._dump(EditOp.Insert, seq_b, blo, best_j)
+            elif blo >= best_j:
+                yield from self._dump(EditOp.Delete, seq_a, alo, best_i)
+            else:
+                # no close or identical pair -- treat it as a straight replace
+                yield from self._plain_replace(seq_a, alo, best_i,
+                                               seq_b, blo, best_j)
+            if best_i == ahi:
+                break
+
+            # do intraline marking on the synch pair
+            aelt, belt = seq_a[best_i], seq_b[best_j]
+            if best_i not in identical:
+                # # pump out seq_a '-', '?', '+', '?' quad for the synched
+                # # lines
+                # atags = btags = ""
+                # cruncher.set_seqs(Util[TElem].lift(aelt),
+                #                   Util[TElem].lift(belt))
+                # for tag, ai1, ai2, bj1, bj2 in cruncher.get_opcodes():
+                #    len_a, len_b = ai2 - ai1, bj2 - bj1
+                #    if tag == 'replace':
+                #        atags += '^' * len_a
+                #        btags += '^' * len_b
+                #    elif tag == 'delete':
+                #        atags += '-' * len_a
+                #    elif tag == 'insert':
+                #        btags += '+' * len_b
+                #    elif tag == 'equal':
+                #        atags += ' ' * len_a
+                #        btags += ' ' * len_b
+                #    else:
+                #        raise ValueError('unknown tag %r' % (tag,))
+                # yield from self._qformat(Util[TElem].lift(aelt),
+                #                         Util[TElem].lift(belt),
+                #                         atags, btags)
+                yield Result(EditOp.Delete, aelt)
+                yield Result(EditOp.Insert, belt)
+            else:
+                # the synch pair is identical
+                yield Result(EditOp.Equal, aelt, belt)
+            alo, blo = best_i + 1, best_j + 1
 
     # def _qformat(self,
     #             aline: Sequence[TElem],
@@ -1351,6 +4228,18 @@ class Differ(Generic[TElem]):  # pylint: disable=too-few-public-methods
 # was inserted after "private".  I can live with that <wink>.
 
 
+def _replace_block(charjunk: Optional[Callable[[Any], bool]],
+                   lsh: Optional[MinHashLSH],
+                   seq_a: List[Any],
+                   seq_b: List[Any]) -> Tuple[List[TReslt], bool]:
+    """Return the delta of the replace block seq_a, seq_b, and whether it's
+    approximate; what the executor of a Differ runs."""
+    differ: Differ[Any] = Differ(charjunk=charjunk, lsh=lsh)
+    results = list(differ._fancy_replace(  # pylint: disable=protected-access
+        seq_a, 0, len(seq_a), seq_b, 0, len(seq_b)))
+    return results, differ.approximate
+
+
 def is_line_junk(line, pat=re.compile(r"\s*(?:#\s*)?$").match):
     r"""
     Return True for ignorable line: iff `line` is blank or contains
@@ -1416,7 +4305,10 @@ class UDiff(Generic[TElem]):  # pylint: disable=too-few-public-methods
                      fromfiledate: str = '',
                      tofiledate: str = '',
                      num_to_show: int = 3,
-                     lineterm: str = '\n') -> Iterable[TReslt]:
+                     lineterm: str = '\n',
+                     algorithm: TAlgo = Algorithm.Default,
+                     cache: Optional[BIndexCache] = None
+                     ) -> Iterable[TReslt]:
         r"""
         Compare two sequences of lines; generate the delta as a unified diff.
 
@@ -1433,6 +4325,9 @@ class UDiff(Generic[TElem]):  # pylint: disable=too-few-public-methods
         For inputs that do not have trailing newlines, set the lineterm
         argument to "" so that the output will be uniformly newline free.
 
+        The algorithm argument selects the SequenceMatcher engine, and the
+        cache argument a BIndexCache it takes the index of b from.
+
         The unidiff format normally has a header for filenames and modification
         times.  Any or all of these may be specified using strings for
         'fromfile', 'tofile', 'fromfiledate', and 'tofiledate'.
@@ -1460,8 +4355,9 @@ class UDiff(Generic[TElem]):  # pylint: disable=too-few-public-methods
                                 fromfile, tofile,
                                 fromfiledate, tofiledate, lineterm)
         started = False
-        for group in SequenceMatcher(None, seq_a, seq_b).get_grouped_opcodes(
-                num_to_show):
+        cruncher = SequenceMatcher(None, seq_a, seq_b, algorithm=algorithm,
+                                   cache=cache)
+        for group in cruncher.get_grouped_opcodes(num_to_show):
             if not started:
                 started = True
                 fromdate = '\t{}'.format(fromfiledate) if fromfiledate else ''
@@ -1519,7 +4415,10 @@ class CDiff(Generic[TElem]):  # pylint: disable=too-few-public-methods
                      fromfiledate: str = '',
                      tofiledate: str = '',
                      num_to_show: int = 3,
-                     lineterm: str = '\n') -> Iterable[TReslt]:
+                     lineterm: str = '\n',
+                     algorithm: TAlgo = Algorithm.Default,
+                     cache: Optional[BIndexCache] = None
+                     ) -> Iterable[TReslt]:
         r"""
         Compare two sequences of lines; generate the delta as a context diff.
 
@@ -1536,6 +4435,9 @@ class CDiff(Generic[TElem]):  # pylint: disable=too-few-public-methods
         For inputs that do not have trailing newlines, set the lineterm
         argument to "" so that the output will be uniformly newline free.
 
+        The algorithm argument selects the SequenceMatcher engine, and the
+        cache argument a BIndexCache it takes the index of b from.
+
         The context diff format normally has a header for filenames and
         modification times.  Any or all of these may be specified using
         strings for 'fromfile', 'tofile', 'fromfiledate', and 'tofiledate'.
@@ -1569,8 +4471,9 @@ class CDiff(Generic[TElem]):  # pylint: disable=too-few-public-methods
                                 fromfile, tofile,
                                 fromfiledate, tofiledate, lineterm)
         started = False
-        for group in SequenceMatcher(None, seq_a, seq_b).get_grouped_opcodes(
-                num_to_show):
+        cruncher = SequenceMatcher(None, seq_a, seq_b, algorithm=algorithm,
+                                   cache=cache)
+        for group in cruncher.get_grouped_opcodes(num_to_show):
             if not started:
                 started = True
                 fromdate = '\t{}'.format(fromfiledate) if fromfiledate else ''
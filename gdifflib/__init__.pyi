@@ -1,5 +1,6 @@
+from concurrent.futures import Executor
 from enum import Enum
-from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, TypeVar, Union
+from typing import Any, Callable, Dict, Generic, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple, TypeVar, Union
 
 TElem = TypeVar('TElem')
 TTag = str
@@ -13,6 +14,20 @@ class EditOp(Enum):
     def __bool__(self) -> bool: ...
 OpCode = Tuple[EditOp, int, int, int, int]
 
+class Algorithm(Enum):
+    Default = ...
+    Myers = ...
+    Patience = ...
+    Hirschberg = ...
+    Auto = ...
+TAlgo = Union[Algorithm, str]
+
+class Kernel(Enum):
+    Dict = ...
+    NumPy = ...
+    Suffix = ...
+TKernel = Union[Kernel, str]
+
 class Result(Generic[TElem]):
     __slot__: Any = ...
     edit_op: Any = ...
@@ -35,29 +50,138 @@ class Match(NamedTuple):
     b: int
     size: int
 
+class CostLimits(NamedTuple):
+    probes: Optional[int] = ...
+    pair_ratios: Optional[int] = ...
+    edits: Optional[int] = ...
+
+class MinHashLSH(NamedTuple):
+    bands: int = ...
+    rows: int = ...
+    shingle: int = ...
+    min_pairs: int = ...
+    seed: int = ...
+
+class Strategy(NamedTuple):
+    algorithm: Algorithm
+    kernel: Kernel
+    intern: bool
+    reason: str
+
+class DiffCancelled(Exception): ...
+
+class CancelToken:
+    deadline: Optional[float] = ...
+    def __init__(self, timeout: Optional[float]=...) -> None: ...
+    def cancel(self) -> None: ...
+    @property
+    def cancelled(self) -> bool: ...
+    def check(self) -> None: ...
+
+class BIndex(Generic[TElem]):
+    seq_b: Any = ...
+    isjunk: Any = ...
+    autojunk: Any = ...
+    intern: Any = ...
+    compact: Any = ...
+    codes: Any = ...
+    b2id: Any = ...
+    id2elt: Any = ...
+    def __init__(self, seq_b: Sequence[TElem], isjunk: Optional[Callable[[TElem], bool]]=..., autojunk: bool=..., intern: bool=..., compact: bool=..., lazy: bool=...) -> None: ...
+    @property
+    def b2j(self) -> Mapping[Any, Sequence[int]]: ...
+    @property
+    def bjunk(self) -> Set[Any]: ...
+    @property
+    def bpopular(self) -> Set[Any]: ...
+    @property
+    def bjunkpos(self) -> List[int]: ...
+    @property
+    def fullbcount(self) -> Dict[Any, int]: ...
+    @property
+    def bmasks(self) -> Dict[Any, int]: ...
+    def numpy_tables(self) -> Tuple[Any, Any, Any]: ...
+    def suffix_automaton(self) -> Any: ...
+    def edit(self, lo: int, hi: int, new: Sequence[TElem]) -> BIndex[TElem]: ...
+    def save(self, path: str) -> None: ...
+    @classmethod
+    def load(cls, path: str, seq_b: Optional[Sequence[TElem]]=...) -> BIndex[TElem]: ...
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+class BIndexCache:
+    maxsize: Any = ...
+    hits: Any = ...
+    misses: Any = ...
+    evictions: Any = ...
+    def __init__(self, maxsize: int=...) -> None: ...
+    @staticmethod
+    def fingerprint(seq_b: Sequence[Any]) -> Tuple[Any, ...]: ...
+    def get(self, seq_b: Sequence[TElem], isjunk: Optional[Callable[[TElem], bool]]=..., autojunk: bool=..., intern: bool=..., compact: bool=..., lazy: bool=...) -> BIndex[TElem]: ...
+    def info(self) -> CacheInfo: ...
+    def clear(self) -> None: ...
+
+BINDEX_CACHE: BIndexCache
+
 class SequenceMatcher(Generic[TElem]):
     isjunk: Any = ...
     seq_a: Any = ...
     seq_b: Any = ...
     autojunk: Any = ...
-    def __init__(self, isjunk: Optional[Callable[[TElem], bool]]=..., a: Sequence[TElem]=..., b: Sequence[TElem]=..., autojunk: bool=...) -> None: ...
+    algorithm: Any = ...
+    intern: Any = ...
+    compact: Any = ...
+    kernel: Any = ...
+    memory_budget: Any = ...
+    cache: Any = ...
+    limits: Optional[CostLimits] = ...
+    approximate: bool = ...
+    cancel: Optional[CancelToken] = ...
+    progress: Optional[Callable[[int, int], None]] = ...
+    auto: bool = ...
+    strategy: Optional[Strategy] = ...
+    def __init__(self, isjunk: Optional[Callable[[TElem], bool]]=..., a: Sequence[TElem]=..., b: Sequence[TElem]=..., autojunk: bool=..., algorithm: TAlgo=..., intern: bool=..., compact: bool=..., kernel: TKernel=..., memory_budget: int=..., cache: Optional[BIndexCache]=..., limits: Optional[CostLimits]=..., cancel: Optional[CancelToken]=..., progress: Optional[Callable[[int, int], None]]=...) -> None: ...
     def set_seqs(self, seq_a: Sequence[TElem], seq_b: Sequence[TElem]) -> None: ...
     opcodes: Any = ...
     matching_blocks: Any = ...
     def set_seq1(self, seq_a: Sequence[TElem]) -> None: ...
-    fullbcount: Any = ...
+    bindex: BIndex[TElem] = ...
     def set_seq2(self, seq_b: Sequence[TElem]) -> None: ...
+    def set_bindex(self, bindex: BIndex[TElem]) -> None: ...
+    def edit_seq1(self, lo: int, hi: int, new: Sequence[TElem]=...) -> None: ...
+    def edit_seq2(self, lo: int, hi: int, new: Sequence[TElem]=...) -> None: ...
+    def extend_seq2(self, new: Sequence[TElem]) -> None: ...
+    @property
+    def b2j(self) -> Mapping[Any, Sequence[int]]: ...
+    @property
+    def bjunk(self) -> Set[Any]: ...
+    @property
+    def bpopular(self) -> Set[Any]: ...
+    @property
+    def bjunkpos(self) -> List[int]: ...
+    @property
+    def fullbcount(self) -> Dict[Any, int]: ...
+    @property
+    def bmasks(self) -> Dict[Any, int]: ...
     def find_longest_match(self, alo: int, ahi: int, blo: int, bhi: int) -> Match: ...
     def get_matching_blocks(self) -> List[Match]: ...
     def get_opcodes(self) -> List[OpCode]: ...
+    def iter_opcodes(self) -> Iterator[OpCode]: ...
     def get_grouped_opcodes(self, size: int=...) -> Iterable[List[OpCode]]: ...
     def ratio(self) -> float: ...
+    def ratio_at_least(self, threshold: float) -> float: ...
     def quick_ratio(self) -> float: ...
+    def lcs_ratio(self) -> float: ...
     def real_quick_ratio(self) -> float: ...
 
 class Util(Generic[TElem]):
     @staticmethod
-    def get_close_matches(word: Sequence[TElem], possibilities: List[Sequence[TElem]], max_size: int=..., cutoff: float=...) -> List[Sequence[TElem]]: ...
+    def get_close_matches(word: Sequence[TElem], possibilities: List[Sequence[TElem]], max_size: int=..., cutoff: float=..., cache: Optional[BIndexCache]=...) -> List[Sequence[TElem]]: ...
     @staticmethod
     def lift(value: Union[Sequence[TElem], TElem]) -> Sequence[TElem]: ...
     @staticmethod
@@ -66,19 +190,28 @@ class Util(Generic[TElem]):
 class Differ(Generic[TElem]):
     linejunk: Any = ...
     charjunk: Any = ...
-    def __init__(self, linejunk: Optional[Callable[[TElem], bool]]=..., charjunk: Optional[Callable[[TElem], bool]]=...) -> None: ...
+    algorithm: Any = ...
+    cache: Any = ...
+    limits: Optional[CostLimits] = ...
+    approximate: bool = ...
+    cancel: Optional[CancelToken] = ...
+    progress: Optional[Callable[[int, int], None]] = ...
+    lsh: Optional[MinHashLSH] = ...
+    executor: Optional[Executor] = ...
+    def __init__(self, linejunk: Optional[Callable[[TElem], bool]]=..., charjunk: Optional[Callable[[TElem], bool]]=..., algorithm: TAlgo=..., cache: Optional[BIndexCache]=..., limits: Optional[CostLimits]=..., cancel: Optional[CancelToken]=..., progress: Optional[Callable[[int, int], None]]=..., lsh: Optional[MinHashLSH]=..., executor: Optional[Executor]=...) -> None: ...
     def compare(self, seq_a: Sequence[TElem], seq_b: Sequence[TElem]) -> Iterable[TReslt]: ...
+    def compare_stream(self, iter_a: Iterable[TElem], iter_b: Iterable[TElem], window: int=...) -> Iterable[TReslt]: ...
 
 def is_line_junk(line: Any, pat: Any = ...): ...
 def is_character_junk(character: Any, whitespaces: str = ...): ...
 
 class UDiff(Generic[TElem]):
     @classmethod
-    def unified_diff(cls: Any, seq_a: Sequence[TElem], seq_b: Sequence[TElem], fromfile: str=..., tofile: str=..., fromfiledate: str=..., tofiledate: str=..., num_to_show: int=..., lineterm: str=...) -> Iterable[TReslt]: ...
+    def unified_diff(cls: Any, seq_a: Sequence[TElem], seq_b: Sequence[TElem], fromfile: str=..., tofile: str=..., fromfiledate: str=..., tofiledate: str=..., num_to_show: int=..., lineterm: str=..., algorithm: TAlgo=..., cache: Optional[BIndexCache]=...) -> Iterable[TReslt]: ...
 
 class CDiff(Generic[TElem]):
     @classmethod
-    def context_diff(cls: Any, seq_a: Sequence[TElem], seq_b: Sequence[TElem], fromfile: str=..., tofile: str=..., fromfiledate: str=..., tofiledate: str=..., num_to_show: int=..., lineterm: str=...) -> Iterable[TReslt]: ...
+    def context_diff(cls: Any, seq_a: Sequence[TElem], seq_b: Sequence[TElem], fromfile: str=..., tofile: str=..., fromfiledate: str=..., tofiledate: str=..., num_to_show: int=..., lineterm: str=..., algorithm: TAlgo=..., cache: Optional[BIndexCache]=...) -> Iterable[TReslt]: ...
 
 def ndiff(seq_a: Any, seq_b: Any, linejunk: Optional[Any] = ..., charjunk: Any = ...): ...
 